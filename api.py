@@ -1,19 +1,27 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, send_file, stream_with_context
 from flask_login import login_required, current_user
-from models import db, Project, Product, SKC, ProductImage, ExcelExport, STATUS_OPTIONS
+from models import db, Project, Product, SKC, ProductImage, ExcelExport, ExportJob, UploadSession, STATUS_OPTIONS, parse_status_priority, status_sort_order, status_order_case, skc_order_by
+from cache import cache, cache_user_project_count, cache_project_product_count, cache_product_skc_count
+from jobs import enqueue_export_job, serialize_job, check_stale_jobs
+from exporter import iter_export_bundle
+from importer import import_workbook, import_csv, is_csv_file, chunked, CSV_EXTENSIONS, IN_BATCH_SIZE
+from chunked_upload import create_upload_file, write_chunk, file_sha256, remove_upload_file
+from tracing import current_trace_id
 from werkzeug.utils import secure_filename
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.drawing.image import Image as XLImage
 import os
-import time
 import uuid
 from datetime import datetime
-from PIL import Image
 import io
+import json
+import base64
+import hashlib
+import csv
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# 复制项目时响应中最多列出的冲突SKC代码数
+CONFLICT_SAMPLE_SIZE = 20
+
 def allowed_file(filename, allowed_extensions):
     """检查文件扩展名是否允许"""
     return '.' in filename and \
@@ -36,23 +44,184 @@ def save_uploaded_file(file, upload_folder, allowed_extensions):
         return unique_filename, file_path
     return None, None
 
+def encode_cursor(values):
+    """将最后一行的排序键编码为游标"""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, converters):
+    """解析游标并按 converters 转换各排序键，无效时返回None"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(converters):
+            return None
+        return [convert(value) for convert, value in zip(converters, values)]
+    except (ValueError, TypeError):
+        return None
+
+def get_per_page(default, maximum):
+    """每页数量，限制在 1 到 maximum 之间"""
+    return max(1, min(request.args.get('per_page', default, type=int), maximum))
+
+def fetch_keyset_page(query, per_page, key_func):
+    """按游标读取一页数据，多取一行用于判断是否还有下一页"""
+    rows = query.limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = None
+    if items and len(rows) > per_page:
+        next_cursor = encode_cursor(key_func(items[-1]))
+    return items, next_cursor
+
+def cached_count(key, query, timeout=60):
+    """获取缓存的总数，未命中时执行COUNT查询"""
+    total = cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        cache.set(key, total, timeout)
+    return total
+
+def user_projects_version(user_id):
+    """用户项目的版本信息（项目数和最后更新时间），所有写操作都会刷新项目的 updated_at"""
+    count, last_updated = db.session.query(
+        db.func.count(Project.id),
+        db.func.max(Project.updated_at)
+    ).filter(
+        Project.user_id == user_id,
+        Project.is_active == True
+    ).one()
+    return count, last_updated.isoformat() if last_updated else ''
+
+def count_by(column, ids):
+    """按外键分组统计行数，返回 {ID: 数量}（一次查询，避免逐行 count()）"""
+    if not ids:
+        return {}
+    return dict(
+        db.session.query(column, db.func.count()).filter(column.in_(ids)).group_by(column).all()
+    )
+
+def owned_skcs_condition(skc_codes):
+    """当前用户有权限的SKC的过滤条件"""
+    owned_products = db.select(Product.id).join(Project).where(
+        Project.user_id == current_user.id,
+        Project.is_active == True
+    )
+    return db.and_(SKC.code.in_(skc_codes), SKC.product_id.in_(owned_products))
+
+def release_deleted_project_name(user_id, name):
+    """重命名占用该名称的已删除项目（唯一约束包括已删除的项目），使名称可以再次使用"""
+    deleted = Project.query.filter_by(user_id=user_id, name=name, is_active=False).first()
+    if deleted:
+        deleted.name = f'{name} (已删除 #{deleted.id})'[:100]
+
+def touch_products_and_projects(product_ids, now):
+    """批量刷新产品及其项目的更新时间"""
+    db.session.execute(
+        db.update(Product)
+        .where(Product.id.in_(product_ids))
+        .values(updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        db.update(Project)
+        .where(Project.id.in_(
+            db.select(Product.project_id).where(Product.id.in_(product_ids))
+        ))
+        .values(updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+def make_etag(*version_parts):
+    """根据版本信息和请求参数生成ETag"""
+    raw = '|'.join(str(part) for part in version_parts)
+    raw += '|' + request.query_string.decode('utf-8', 'replace')
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def is_not_modified(etag):
+    """客户端缓存的ETag是否仍然有效"""
+    return request.if_none_match.contains_weak(etag)
+
+def with_etag(response, etag):
+    """为响应附加ETag，并要求客户端每次使用前重新验证"""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified(etag):
+    """返回 304 Not Modified"""
+    return with_etag(current_app.response_class(status=304), etag)
+
+def keyset_pagination(per_page, next_cursor, count_key, count_query):
+    """游标分页信息，仅在 with_total=1 时返回（缓存的）总数"""
+    pagination = {
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    }
+    if request.args.get('with_total', 0, type=int):
+        pagination['total'] = cached_count(count_key, count_query)
+    return pagination
+
 # ========== 项目管理 API ==========
 
 @api_bp.route('/projects', methods=['GET'])
 @login_required
 def get_projects():
-    """获取用户的所有项目"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    """获取用户的所有项目
+    
+    传入 cursor 参数（首页为空字符串）时使用游标分页，返回 next_cursor
+    """
+    etag = make_etag('projects', current_user.id, *user_projects_version(current_user.id))
+    if is_not_modified(etag):
+        return not_modified(etag)
     
-    projects = Project.query.filter_by(
+    per_page = get_per_page(20, 100)
+    cursor = request.args.get('cursor')
+    
+    base_query = Project.query.filter_by(
         user_id=current_user.id, 
         is_active=True
-    ).order_by(Project.updated_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
     )
     
-    return jsonify({
+    if cursor is not None:
+        query = base_query
+        if cursor:
+            key = decode_cursor(cursor, (datetime.fromisoformat, int))
+            if key is None:
+                return jsonify({'success': False, 'message': '游标无效'}), 400
+            updated_at, last_id = key
+            query = query.filter(db.or_(
+                Project.updated_at < updated_at,
+                db.and_(Project.updated_at == updated_at, Project.id < last_id)
+            ))
+        
+        items, next_cursor = fetch_keyset_page(
+            query.order_by(Project.updated_at.desc(), Project.id.desc()),
+            per_page,
+            lambda p: [p.updated_at.isoformat(), p.id]
+        )
+        pagination = keyset_pagination(
+            per_page, next_cursor,
+            cache_user_project_count(current_user.id), base_query
+        )
+    else:
+        page = request.args.get('page', 1, type=int)
+        projects = base_query.order_by(
+            Project.updated_at.desc(), Project.id.desc()
+        ).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        items = projects.items
+        pagination = {
+            'page': projects.page,
+            'pages': projects.pages,
+            'per_page': projects.per_page,
+            'total': projects.total
+        }
+    
+    product_counts = count_by(Product.project_id, [p.id for p in items])
+    
+    return with_etag(jsonify({
         'success': True,
         'projects': [{
             'id': p.id,
@@ -60,15 +229,10 @@ def get_projects():
             'description': p.description,
             'created_at': p.created_at.isoformat(),
             'updated_at': p.updated_at.isoformat(),
-            'product_count': p.products.count()
-        } for p in projects.items],
-        'pagination': {
-            'page': projects.page,
-            'pages': projects.pages,
-            'per_page': projects.per_page,
-            'total': projects.total
-        }
-    })
+            'product_count': product_counts.get(p.id, 0)
+        } for p in items],
+        'pagination': pagination
+    }), etag)
 
 @api_bp.route('/projects', methods=['POST'])
 @login_required
@@ -92,6 +256,7 @@ def create_project():
         return jsonify({'success': False, 'message': '项目名称已存在'}), 400
     
     try:
+        release_deleted_project_name(current_user.id, name)
         project = Project(
             name=name,
             description=description,
@@ -147,6 +312,8 @@ def update_project(project_id):
         return jsonify({'success': False, 'message': '项目名称已存在'}), 400
     
     try:
+        if name != project.name:
+            release_deleted_project_name(current_user.id, name)
         project.name = name
         project.description = description
         project.updated_at = datetime.utcnow()
@@ -183,6 +350,7 @@ def delete_project(project_id):
     try:
         project.is_active = False
         project.updated_at = datetime.utcnow()
+        project.deleted_at = project.updated_at
         db.session.commit()
         
         return jsonify({'success': True, 'message': '项目删除成功'})
@@ -191,6 +359,186 @@ def delete_project(project_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': '删除项目失败'}), 500
 
+@api_bp.route('/projects/<int:project_id>/duplicate', methods=['POST'])
+@login_required
+def duplicate_project(project_id):
+    """复制项目：产品、图片引用，以及可选的SKC
+    
+    请求体 {"name", "description", "include_skcs", "code_prefix", "code_suffix",
+    "code_replace": {"from", "to"}, "skip_conflicts"}。SKC代码全局唯一，复制SKC时
+    必须提供改写规则（新代码 = 前缀 + 替换后的代码 + 后缀）。
+    所有数据使用 INSERT ... SELECT 在同一事务中复制
+    """
+    source = Project.query.filter_by(
+        id=project_id, 
+        user_id=current_user.id, 
+        is_active=True
+    ).first()
+    
+    if not source:
+        return jsonify({'success': False, 'message': '项目不存在'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    name = (data.get('name') or '').strip()
+    description = data.get('description')
+    include_skcs = bool(data.get('include_skcs'))
+    skip_conflicts = bool(data.get('skip_conflicts'))
+    prefix = data.get('code_prefix') or ''
+    suffix = data.get('code_suffix') or ''
+    replace = data.get('code_replace') or {}
+    
+    if not name:
+        return jsonify({'success': False, 'message': '项目名称不能为空'}), 400
+    
+    if Project.query.filter_by(user_id=current_user.id, name=name, is_active=True).first():
+        return jsonify({'success': False, 'message': '项目名称已存在'}), 400
+    
+    if not isinstance(prefix, str) or not isinstance(suffix, str) or not isinstance(replace, dict):
+        return jsonify({'success': False, 'message': '代码改写规则格式错误'}), 400
+    
+    replace_from = replace.get('from') or ''
+    replace_to = replace.get('to') or ''
+    if include_skcs and not (prefix or suffix or (replace_from and replace_from != replace_to)):
+        return jsonify({'success': False, 'message': '复制SKC时必须提供代码改写规则'}), 400
+    
+    try:
+        release_deleted_project_name(current_user.id, name)
+        now = datetime.utcnow()
+        project = Project(
+            name=name,
+            description=source.description if description is None else description.strip(),
+            user_id=current_user.id,
+            status_priority=source.status_priority
+        )
+        db.session.add(project)
+        db.session.flush()
+        
+        # 复制产品
+        db.session.execute(
+            db.insert(Product).from_select(
+                ['name', 'project_id', 'created_at', 'updated_at'],
+                db.select(Product.name, db.literal(project.id), db.literal(now), db.literal(now))
+                .where(Product.project_id == source.id)
+            )
+        )
+        
+        # 原产品ID到新产品ID的映射（同一项目下产品名唯一）
+        old_product = db.aliased(Product)
+        new_product = db.aliased(Product)
+        mapping = db.select(
+            old_product.id.label('old_id'), new_product.id.label('new_id')
+        ).join(
+            new_product,
+            db.and_(new_product.name == old_product.name, new_product.project_id == project.id)
+        ).where(
+            old_product.project_id == source.id
+        ).subquery()
+        
+        # 复制图片记录（与原项目共用图片文件）
+        image_result = db.session.execute(
+            db.insert(ProductImage).from_select(
+                ['filename', 'original_filename', 'file_path', 'file_size', 'mime_type',
+                 'product_id', 'uploaded_at', 'is_primary'],
+                db.select(
+                    ProductImage.filename, ProductImage.original_filename, ProductImage.file_path,
+                    ProductImage.file_size, ProductImage.mime_type, mapping.c.new_id,
+                    ProductImage.uploaded_at, ProductImage.is_primary
+                ).join(mapping, ProductImage.product_id == mapping.c.old_id)
+            )
+        )
+        
+        skc_count = 0
+        conflict_count = 0
+        if include_skcs:
+            new_code = db.literal(prefix) + (
+                db.func.replace(SKC.code, replace_from, replace_to) if replace_from else SKC.code
+            ) + db.literal(suffix)
+            existing = db.aliased(SKC)
+            conflicts = db.exists().where(existing.code == new_code)
+            
+            # 不同的原代码改写后相同时无法复制（跳过冲突也不能处理）
+            duplicates = db.session.scalars(
+                db.select(new_code)
+                .join(mapping, SKC.product_id == mapping.c.old_id)
+                .group_by(new_code)
+                .having(db.func.count(SKC.id) > 1)
+                .limit(CONFLICT_SAMPLE_SIZE)
+            ).all()
+            if duplicates:
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'message': f'多个SKC改写后的代码相同: {", ".join(duplicates)}',
+                    'duplicate_codes': duplicates
+                }), 409
+            
+            conflict_count = db.session.scalar(
+                db.select(db.func.count(SKC.id))
+                .join(mapping, SKC.product_id == mapping.c.old_id)
+                .where(conflicts)
+            )
+            if conflict_count and not skip_conflicts:
+                conflict_codes = db.session.scalars(
+                    db.select(new_code)
+                    .join(mapping, SKC.product_id == mapping.c.old_id)
+                    .where(conflicts)
+                    .order_by(SKC.code)
+                    .limit(CONFLICT_SAMPLE_SIZE)
+                ).all()
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'message': f'有 {conflict_count} 个改写后的SKC代码已存在',
+                    'conflict_count': conflict_count,
+                    'conflict_codes': conflict_codes
+                }), 409
+            
+            skc_result = db.session.execute(
+                db.insert(SKC).from_select(
+                    ['code', 'status', 'product_id', 'sort_order', 'created_at', 'updated_at'],
+                    db.select(
+                        new_code, SKC.status, mapping.c.new_id,
+                        status_order_case(source.get_status_priority()),
+                        db.literal(now), db.literal(now)
+                    )
+                    .join(mapping, SKC.product_id == mapping.c.old_id)
+                    .where(~conflicts)
+                )
+            )
+            skc_count = skc_result.rowcount
+        
+        db.session.commit()
+        
+        product_count = db.session.scalar(
+            db.select(db.func.count(Product.id)).where(Product.project_id == project.id)
+        )
+        
+        message = f'项目复制成功，复制产品 {product_count} 个'
+        if include_skcs:
+            message += f'，SKC {skc_count} 个'
+        if conflict_count:
+            message += f'，跳过代码冲突的SKC {conflict_count} 个'
+        
+        return jsonify({
+            'success': True,
+            'message': message,
+            'project': {
+                'id': project.id,
+                'name': project.name,
+                'description': project.description,
+                'created_at': project.created_at.isoformat()
+            },
+            'product_count': product_count,
+            'image_count': image_result.rowcount,
+            'skc_count': skc_count,
+            'skipped_count': conflict_count
+        })
+    
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('复制项目失败')
+        return jsonify({'success': False, 'message': '复制项目失败'}), 500
+
 # ========== 产品管理 API ==========
 
 @api_bp.route('/projects/<int:project_id>/products', methods=['GET'])
@@ -206,32 +554,67 @@ def get_products(project_id):
     if not project:
         return jsonify({'success': False, 'message': '项目不存在'}), 404
     
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    etag = make_etag('products', project.id, project.updated_at.isoformat())
+    if is_not_modified(etag):
+        return not_modified(etag)
+    
+    per_page = get_per_page(20, 100)
+    cursor = request.args.get('cursor')
+    
+    base_query = Product.query.filter_by(project_id=project_id)
+    
+    if cursor is not None:
+        query = base_query
+        if cursor:
+            key = decode_cursor(cursor, (datetime.fromisoformat, int))
+            if key is None:
+                return jsonify({'success': False, 'message': '游标无效'}), 400
+            updated_at, last_id = key
+            query = query.filter(db.or_(
+                Product.updated_at < updated_at,
+                db.and_(Product.updated_at == updated_at, Product.id < last_id)
+            ))
+        
+        items, next_cursor = fetch_keyset_page(
+            query.order_by(Product.updated_at.desc(), Product.id.desc()),
+            per_page,
+            lambda p: [p.updated_at.isoformat(), p.id]
+        )
+        pagination = keyset_pagination(
+            per_page, next_cursor,
+            cache_project_product_count(project_id), base_query
+        )
+    else:
+        page = request.args.get('page', 1, type=int)
+        products = base_query.order_by(
+            Product.updated_at.desc(), Product.id.desc()
+        ).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        items = products.items
+        pagination = {
+            'page': products.page,
+            'pages': products.pages,
+            'per_page': products.per_page,
+            'total': products.total
+        }
     
-    products = Product.query.filter_by(
-        project_id=project_id
-    ).order_by(Product.updated_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    product_ids = [p.id for p in items]
+    skc_counts = count_by(SKC.product_id, product_ids)
+    image_counts = count_by(ProductImage.product_id, product_ids)
     
-    return jsonify({
+    return with_etag(jsonify({
         'success': True,
         'products': [{
             'id': p.id,
             'name': p.name,
             'created_at': p.created_at.isoformat(),
             'updated_at': p.updated_at.isoformat(),
-            'skc_count': p.skcs.count(),
-            'image_count': p.images.count()
-        } for p in products.items],
-        'pagination': {
-            'page': products.page,
-            'pages': products.pages,
-            'per_page': products.per_page,
-            'total': products.total
-        }
-    })
+            'skc_count': skc_counts.get(p.id, 0),
+            'image_count': image_counts.get(p.id, 0)
+        } for p in items],
+        'pagination': pagination
+    }), etag)
 
 @api_bp.route('/projects/<int:project_id>/products', methods=['POST'])
 @login_required
@@ -302,42 +685,71 @@ def get_skcs(product_id):
     if not product:
         return jsonify({'success': False, 'message': '产品不存在'}), 404
     
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 50, type=int), 200)
+    etag = make_etag(
+        'skcs', product.id,
+        product.updated_at.isoformat(), product.project.updated_at.isoformat()
+    )
+    if is_not_modified(etag):
+        return not_modified(etag)
+    
+    per_page = get_per_page(50, 200)
     status_filter = request.args.get('status')
+    cursor = request.args.get('cursor')
     
-    query = SKC.query.filter_by(product_id=product_id)
+    base_query = SKC.query.filter_by(product_id=product_id)
     
     if status_filter and status_filter in STATUS_OPTIONS:
-        query = query.filter_by(status=status_filter)
-    
-    skcs = query.order_by(
-        db.case(
-            *[(SKC.status == status, idx) for idx, status in enumerate(STATUS_OPTIONS)],
-            else_=len(STATUS_OPTIONS)
-        ),
-        SKC.code
-    ).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+        base_query = base_query.filter_by(status=status_filter)
+    else:
+        status_filter = None
+    
+    if cursor is not None:
+        query = base_query
+        if cursor:
+            key = decode_cursor(cursor, (int, str))
+            if key is None:
+                return jsonify({'success': False, 'message': '游标无效'}), 400
+            sort_key, last_code = key
+            # 游标使用存储的排序键和代码，每页都从 idx_product_sort 索引中的位置开始读取
+            query = query.filter(db.or_(
+                SKC.sort_order > sort_key,
+                db.and_(SKC.sort_order == sort_key, SKC.code > last_code)
+            ))
+        
+        items, next_cursor = fetch_keyset_page(
+            query.order_by(SKC.sort_order, SKC.code),
+            per_page,
+            lambda s: [s.sort_order, s.code]
+        )
+        pagination = keyset_pagination(
+            per_page, next_cursor,
+            cache_product_skc_count(product_id, status_filter), base_query
+        )
+    else:
+        page = request.args.get('page', 1, type=int)
+        skcs = base_query.order_by(*skc_order_by()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        items = skcs.items
+        pagination = {
+            'page': skcs.page,
+            'pages': skcs.pages,
+            'per_page': skcs.per_page,
+            'total': skcs.total
+        }
     
-    return jsonify({
+    return with_etag(jsonify({
         'success': True,
         'skcs': [{
             'id': s.id,
             'code': s.code,
             'status': s.status,
-            'created_at': s.created_at.isoformat(),
-            'updated_at': s.updated_at.isoformat()
-        } for s in skcs.items],
-        'pagination': {
-            'page': skcs.page,
-            'pages': skcs.pages,
-            'per_page': skcs.per_page,
-            'total': skcs.total
-        },
+            'created_at': s.created_at,
+            'updated_at': s.updated_at
+        } for s in items],
+        'pagination': pagination,
         'status_options': STATUS_OPTIONS
-    })
+    }), etag)
 
 @api_bp.route('/products/<int:product_id>/skcs', methods=['POST'])
 @login_required
@@ -363,31 +775,38 @@ def add_skcs(product_id):
         return jsonify({'success': False, 'message': '状态选项无效'}), 400
     
     try:
-        added_count = 0
-        duplicate_codes = []
+        codes = [code for code in (str(code).strip() for code in skc_codes) if code]
         
-        for code in skc_codes:
-            code = str(code).strip()
-            if not code:
-                continue
-            
-            # 检查SKC是否已存在（全局唯一）
-            existing = SKC.query.filter_by(code=code).first()
-            if existing:
+        # 检查SKC是否已存在（全局唯一），一次查询出所有已存在的代码
+        existing = set()
+        for batch in chunked(set(codes), IN_BATCH_SIZE):
+            existing.update(db.session.scalars(db.select(SKC.code).where(SKC.code.in_(batch))))
+        
+        now = datetime.utcnow()
+        sort_order = status_sort_order(status, product.project.get_status_priority())
+        rows = []
+        duplicate_codes = []
+        for code in codes:
+            if code in existing:
                 duplicate_codes.append(code)
                 continue
-            
-            skc = SKC(
-                code=code,
-                status=status,
-                product_id=product_id
-            )
-            db.session.add(skc)
-            added_count += 1
+            existing.add(code)
+            rows.append({
+                'code': code,
+                'status': status,
+                'product_id': product_id,
+                'sort_order': sort_order,
+                'created_at': now,
+                'updated_at': now
+            })
+        
+        if rows:
+            db.session.execute(db.insert(SKC), rows)
+        added_count = len(rows)
         
         # 更新产品和项目的更新时间
-        product.updated_at = datetime.utcnow()
-        product.project.updated_at = datetime.utcnow()
+        product.updated_at = now
+        product.project.updated_at = now
         
         db.session.commit()
         
@@ -423,23 +842,35 @@ def batch_update_skcs():
         return jsonify({'success': False, 'message': '状态选项无效'}), 400
     
     try:
-        # 查找用户有权限的SKC
-        skcs = SKC.query.join(Product).join(Project).filter(
-            SKC.code.in_(skc_codes),
-            Project.user_id == current_user.id,
-            Project.is_active == True
+        # 查找用户有权限的SKC所属的产品
+        condition = owned_skcs_condition(skc_codes)
+        product_ids = db.session.scalars(
+            db.select(SKC.product_id).where(condition).distinct()
         ).all()
         
-        if not skcs:
+        if not product_ids:
             return jsonify({'success': False, 'message': '未找到可更新的SKC'}), 404
         
+        # 排序键取决于所属项目的状态优先级，按排序键分组更新（通常只有一组）
+        products_by_order = {}
+        for product_id, status_priority in db.session.execute(
+            db.select(Product.id, Project.status_priority)
+            .join(Project, Product.project_id == Project.id)
+            .where(Product.id.in_(product_ids))
+        ):
+            sort_order = status_sort_order(new_status, parse_status_priority(status_priority))
+            products_by_order.setdefault(sort_order, []).append(product_id)
+        
+        now = datetime.utcnow()
         updated_count = 0
-        for skc in skcs:
-            skc.status = new_status
-            skc.updated_at = datetime.utcnow()
-            skc.product.updated_at = datetime.utcnow()
-            skc.product.project.updated_at = datetime.utcnow()
-            updated_count += 1
+        for sort_order, ids in products_by_order.items():
+            updated_count += db.session.execute(
+                db.update(SKC)
+                .where(condition, SKC.product_id.in_(ids))
+                .values(status=new_status, sort_order=sort_order, updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        touch_products_and_projects(product_ids, now)
         
         db.session.commit()
         
@@ -464,22 +895,21 @@ def batch_delete_skcs():
         return jsonify({'success': False, 'message': 'SKC代码不能为空'}), 400
     
     try:
-        # 查找用户有权限的SKC
-        skcs = SKC.query.join(Product).join(Project).filter(
-            SKC.code.in_(skc_codes),
-            Project.user_id == current_user.id,
-            Project.is_active == True
+        # 查找用户有权限的SKC所属的产品
+        condition = owned_skcs_condition(skc_codes)
+        product_ids = db.session.scalars(
+            db.select(SKC.product_id).where(condition).distinct()
         ).all()
         
-        if not skcs:
+        if not product_ids:
             return jsonify({'success': False, 'message': '未找到可删除的SKC'}), 404
         
-        deleted_count = len(skcs)
-        
-        for skc in skcs:
-            skc.product.updated_at = datetime.utcnow()
-            skc.product.project.updated_at = datetime.utcnow()
-            db.session.delete(skc)
+        deleted_count = db.session.execute(
+            db.delete(SKC)
+            .where(condition)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        touch_products_and_projects(product_ids, datetime.utcnow())
         
         db.session.commit()
         
@@ -493,7 +923,128 @@ def batch_delete_skcs():
         db.session.rollback()
         return jsonify({'success': False, 'message': '删除SKC失败'}), 500
 
-# ========== 图片管理 API ==========
+@api_bp.route('/skcs/batch_move', methods=['PUT'])
+@login_required
+def batch_move_skcs():
+    """批量移动SKC到目标产品（可跨项目），保留创建时间
+    
+    请求体 {"skc_codes": [...], "target_product_id": id}，只移动当前用户有权限的SKC
+    """
+    data = request.get_json(silent=True) or {}
+    skc_codes = data.get('skc_codes', [])
+    target_product_id = data.get('target_product_id')
+    
+    if not skc_codes:
+        return jsonify({'success': False, 'message': 'SKC代码不能为空'}), 400
+    
+    target = Product.query.join(Project).filter(
+        Product.id == target_product_id,
+        Project.user_id == current_user.id,
+        Project.is_active == True
+    ).first()
+    
+    if not target:
+        return jsonify({'success': False, 'message': '目标产品不存在'}), 404
+    
+    try:
+        condition = db.and_(owned_skcs_condition(skc_codes), SKC.product_id != target.id)
+        
+        source_product_ids = db.session.scalars(
+            db.select(SKC.product_id).where(condition).distinct()
+        ).all()
+        
+        if not source_product_ids:
+            return jsonify({'success': False, 'message': '未找到可移动的SKC'}), 404
+        
+        now = datetime.utcnow()
+        # 按目标项目的状态优先级重新计算排序键
+        moved_count = db.session.execute(
+            db.update(SKC)
+            .where(condition)
+            .values(
+                product_id=target.id,
+                sort_order=status_order_case(target.project.get_status_priority()),
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        
+        # 更新涉及的产品和项目的更新时间
+        product_ids = set(source_product_ids) | {target.id}
+        touch_products_and_projects(product_ids, now)
+        
+        skc_counts = dict(db.session.execute(
+            db.select(SKC.product_id, db.func.count(SKC.id))
+            .where(SKC.product_id.in_(product_ids))
+            .group_by(SKC.product_id)
+        ).all())
+        
+        db.session.commit()
+        
+        for product_id in product_ids:
+            cache.delete_pattern(cache_product_skc_count(product_id, '*'))
+        
+        return jsonify({
+            'success': True,
+            'message': f'成功移动 {moved_count} 个SKC',
+            'moved_count': moved_count,
+            'skc_counts': {
+                product_id: skc_counts.get(product_id, 0) for product_id in product_ids
+            }
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': '移动SKC失败'}), 500
+
+@api_bp.route('/projects/<int:project_id>/auto_sort', methods=['POST'])
+@login_required
+def auto_sort_skcs(project_id):
+    """按状态优先级自动整理项目内所有SKC的排序"""
+    project = Project.query.filter_by(
+        id=project_id, 
+        user_id=current_user.id, 
+        is_active=True
+    ).first()
+    
+    if not project:
+        return jsonify({'success': False, 'message': '项目不存在'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    status_priority = data.get('status_priority')
+    
+    if status_priority is not None:
+        if not isinstance(status_priority, list) or \
+                any(status not in STATUS_OPTIONS for status in status_priority) or \
+                len(set(status_priority)) != len(status_priority):
+            return jsonify({'success': False, 'message': '状态优先级无效'}), 400
+        project.status_priority = json.dumps(status_priority, ensure_ascii=False)
+    
+    priority = project.get_status_priority()
+    
+    try:
+        # 一条UPDATE语句写入整个项目的排序键
+        product_ids = db.select(Product.id).where(Product.project_id == project_id)
+        result = db.session.execute(
+            db.update(SKC)
+            .where(SKC.product_id.in_(product_ids))
+            .values(sort_order=status_order_case(priority))
+            .execution_options(synchronize_session=False)
+        )
+        
+        project.updated_at = datetime.utcnow()
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': f'自动整理完成，共整理 {result.rowcount} 个SKC',
+            'sorted_count': result.rowcount,
+            'status_priority': priority
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': '自动整理失败'}), 500
 
 # ========== 图片管理 API ==========
 
@@ -510,12 +1061,19 @@ def get_product_images(product_id):
     if not product:
         return jsonify({'success': False, 'message': '产品不存在'}), 404
     
+    etag = make_etag(
+        'images', product.id,
+        product.updated_at.isoformat(), product.project.updated_at.isoformat()
+    )
+    if is_not_modified(etag):
+        return not_modified(etag)
+    
     images = ProductImage.query.filter_by(product_id=product_id).order_by(
         ProductImage.is_primary.desc(),
         ProductImage.uploaded_at.desc()
     ).all()
     
-    return jsonify({
+    return with_etag(jsonify({
         'success': True,
         'images': [{
             'id': img.id,
@@ -525,9 +1083,9 @@ def get_product_images(product_id):
             'file_size': img.file_size,
             'mime_type': img.mime_type,
             'is_primary': img.is_primary,
-            'uploaded_at': img.uploaded_at.isoformat()
+            'uploaded_at': img.uploaded_at
         } for img in images]
-    })
+    }), etag)
 
 @api_bp.route('/products/<int:product_id>/images', methods=['POST'])
 @login_required
@@ -623,6 +1181,10 @@ def set_primary_image(image_id):
         # 设置当前图片为主图
         image.is_primary = True
         
+        # 更新产品和项目的更新时间
+        image.product.updated_at = datetime.utcnow()
+        image.product.project.updated_at = datetime.utcnow()
+        
         db.session.commit()
         
         return jsonify({
@@ -648,10 +1210,18 @@ def delete_image(image_id):
         return jsonify({'success': False, 'message': '图片不存在'}), 404
     
     try:
-        # 删除文件
-        if os.path.exists(image.file_path):
+        # 删除文件（复制的项目共用图片文件，仍被其他图片记录引用时保留）
+        shared = ProductImage.query.filter(
+            ProductImage.file_path == image.file_path,
+            ProductImage.id != image.id
+        ).first()
+        if not shared and os.path.exists(image.file_path):
             os.remove(image.file_path)
         
+        # 更新产品和项目的更新时间
+        image.product.updated_at = datetime.utcnow()
+        image.product.project.updated_at = datetime.utcnow()
+        
         # 删除数据库记录
         db.session.delete(image)
         db.session.commit()
@@ -670,6 +1240,10 @@ def delete_image(image_id):
 def get_user_stats():
     """获取用户的统计数据"""
     try:
+        etag = make_etag('stats', current_user.id, *user_projects_version(current_user.id))
+        if is_not_modified(etag):
+            return not_modified(etag)
+        
         # 获取用户的项目数
         project_count = Project.query.filter_by(
             user_id=current_user.id,
@@ -694,7 +1268,7 @@ def get_user_stats():
             Project.is_active == True
         ).count()
         
-        return jsonify({
+        return with_etag(jsonify({
             'success': True,
             'stats': {
                 'project_count': project_count,
@@ -702,13 +1276,16 @@ def get_user_stats():
                 'skc_count': skc_count,
                 'image_count': image_count
             }
-        })
+        }), etag)
     
     except Exception as e:
         return jsonify({'success': False, 'message': '获取统计数据失败'}), 500
 
 # ========== Excel导入导出 API ==========
 
+# 允许导入的文件类型
+IMPORT_EXTENSIONS = {'xlsx', 'xlsm'} | CSV_EXTENSIONS
+
 @api_bp.route('/projects/<int:project_id>/import', methods=['POST'])
 @login_required
 def import_excel_data(project_id):
@@ -729,76 +1306,44 @@ def import_excel_data(project_id):
     if file.filename == '':
         return jsonify({'success': False, 'message': '未选择Excel文件'}), 400
     
+    layout, mode, error = get_import_options(request.form)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    
     # 保存Excel文件
     upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp')
     filename, file_path = save_uploaded_file(
-        file, upload_folder, {'xlsx', 'xlsm'}
+        file, upload_folder, IMPORT_EXTENSIONS
     )
     
     if not filename:
         return jsonify({'success': False, 'message': 'Excel格式不支持'}), 400
     
+    return run_import(project, file_path, layout, mode)
+
+def get_import_options(data):
+    """读取并校验导入参数，返回 (layout, mode, 错误信息)"""
+    # layout: CSV布局（wide/long，默认自动判断）；mode: insert 跳过已存在的SKC，upsert 同时更新状态
+    layout = data.get('layout')
+    if layout not in (None, '', 'wide', 'long'):
+        return None, None, '导入布局无效'
+    
+    mode = data.get('mode') or 'insert'
+    if mode not in ('insert', 'upsert'):
+        return None, None, '导入模式无效'
+    
+    return layout or None, mode, None
+
+def run_import(project, file_path, layout=None, mode='insert'):
+    """导入已保存的文件并删除临时文件，返回JSON响应"""
     try:
-        # 读取Excel文件
-        wb = load_workbook(file_path, data_only=True)
-        imported_count = 0
-        skipped_count = 0
-        
-        for ws in wb.worksheets:
-            max_col = ws.max_column
-            
-            # 按列处理数据（每两列为一个产品）
-            for col in range(1, max_col + 1, 2):
-                product_name_cell = ws.cell(row=1, column=col)
-                if not product_name_cell.value:
-                    continue
-                
-                product_name = str(product_name_cell.value).strip()
-                
-                # 创建或获取产品
-                product = Product.query.filter_by(
-                    project_id=project_id,
-                    name=product_name
-                ).first()
-                
-                if not product:
-                    product = Product(
-                        name=product_name,
-                        project_id=project_id
-                    )
-                    db.session.add(product)
-                    db.session.flush()  # 获取ID
-                
-                # 读取SKC数据（从第4行开始）
-                max_row = ws.max_row
-                for row in range(4, max_row + 1):
-                    skc_cell = ws.cell(row=row, column=col)
-                    status_cell = ws.cell(row=row, column=col + 1)
-                    
-                    if not skc_cell.value or not status_cell.value:
-                        continue
-                    
-                    skc_code = str(skc_cell.value).strip()
-                    status = str(status_cell.value).strip()
-                    
-                    # 检查SKC是否已存在
-                    existing_skc = SKC.query.filter_by(code=skc_code).first()
-                    if existing_skc:
-                        skipped_count += 1
-                        continue
-                    
-                    # 验证状态
-                    if status not in STATUS_OPTIONS:
-                        status = '核价通过'  # 默认状态
-                    
-                    # 创建SKC
-                    skc = SKC(
-                        code=skc_code,
-                        status=status,
-                        product_id=product.id
-                    )
-                    db.session.add(skc)
-                    imported_count += 1
+        if is_csv_file(file_path):
+            # CSV/TSV 流式解析并批量写入
+            counts = import_csv(project.id, file_path, layout, mode=mode)
+        else:
+            counts = import_workbook(
+                project.id, file_path, current_app.config['IMPORT_WORKERS'], mode=mode
+            )
         
         # 更新项目时间
         project.updated_at = datetime.utcnow()
@@ -808,15 +1353,19 @@ def import_excel_data(project_id):
         if os.path.exists(file_path):
             os.remove(file_path)
         
-        message = f'成功导入 {imported_count} 条记录'
-        if skipped_count > 0:
-            message += f'，跳过重复记录 {skipped_count} 条'
+        message = f'成功导入 {counts["imported"]} 条记录'
+        if mode == 'upsert':
+            message += f'，更新状态 {counts["updated"]} 条，状态未变 {counts["unchanged"]} 条'
+        if counts['skipped'] > 0:
+            message += f'，跳过重复记录 {counts["skipped"]} 条'
         
         return jsonify({
             'success': True,
             'message': message,
-            'imported_count': imported_count,
-            'skipped_count': skipped_count
+            'imported_count': counts['imported'],
+            'updated_count': counts['updated'],
+            'unchanged_count': counts['unchanged'],
+            'skipped_count': counts['skipped']
         })
     
     except Exception as e:
@@ -826,10 +1375,33 @@ def import_excel_data(project_id):
             os.remove(file_path)
         return jsonify({'success': False, 'message': f'导入失败: {str(e)}'}), 500
 
-@api_bp.route('/projects/<int:project_id>/export', methods=['POST'])
+# ========== 分片上传 API ==========
+
+def serialize_upload(upload):
+    """分片上传会话的JSON表示"""
+    return {
+        'id': upload.id,
+        'project_id': upload.project_id,
+        'filename': upload.filename,
+        'total_size': upload.total_size,
+        'received': upload.received,
+        'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE']
+    }
+
+def get_upload_session(upload_id):
+    """获取当前用户的分片上传会话"""
+    return UploadSession.query.filter_by(
+        id=upload_id,
+        user_id=current_user.id
+    ).first()
+
+@api_bp.route('/projects/<int:project_id>/uploads', methods=['POST'])
 @login_required
-def export_project_excel(project_id):
-    """导出项目为Excel文件"""
+def create_upload(project_id):
+    """创建分片上传会话
+    
+    请求体 {"filename", "size", "sha256"(可选)}，之后按偏移量上传分片，全部上传后调用 complete 导入
+    """
     project = Project.query.filter_by(
         id=project_id, 
         user_id=current_user.id, 
@@ -839,97 +1411,247 @@ def export_project_excel(project_id):
     if not project:
         return jsonify({'success': False, 'message': '项目不存在'}), 404
     
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    size = data.get('size')
+    checksum = (data.get('sha256') or '').lower() or None
+    
+    if not allowed_file(filename, IMPORT_EXTENSIONS):
+        return jsonify({'success': False, 'message': 'Excel格式不支持'}), 400
+    
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({'success': False, 'message': '文件大小无效'}), 400
+    
+    if size > current_app.config['UPLOAD_MAX_SIZE']:
+        return jsonify({'success': False, 'message': '文件太大'}), 413
+    
+    if checksum and (len(checksum) != 64 or any(c not in '0123456789abcdef' for c in checksum)):
+        return jsonify({'success': False, 'message': '校验值格式错误'}), 400
+    
     try:
-        # 创建Excel文件
-        wb = Workbook()
-        ws = wb.active
-        ws.title = project.name
-        
-        # 获取项目的所有产品和SKC
-        products = Product.query.filter_by(project_id=project_id).all()
-        
-        col = 1
-        for product in products:
-            # 写产品名
-            ws.merge_cells(start_row=1, start_column=col, end_row=1, end_column=col+1)
-            ws.cell(row=1, column=col, value=product.name)
-            
-            # 添加图片（如果有主图）
-            primary_image = ProductImage.query.filter_by(
-                product_id=product.id, 
-                is_primary=True
-            ).first()
-            
-            if primary_image and os.path.exists(primary_image.file_path):
-                try:
-                    img = XLImage(primary_image.file_path)
-                    img.width = 100
-                    img.height = 100
-                    ws.add_image(img, f"{get_column_letter(col)}2")
-                    ws.row_dimensions[2].height = 80
-                    ws.column_dimensions[get_column_letter(col)].width = 15
-                except Exception:
-                    pass
-            
-            # 写表头
-            ws.cell(row=3, column=col, value="SKC")
-            ws.cell(row=3, column=col+1, value="状态")
-            
-            # 写SKC数据
-            skcs = SKC.query.filter_by(product_id=product.id).order_by(
-                db.case(
-                    *[(SKC.status == status, idx) for idx, status in enumerate(STATUS_OPTIONS)],
-                    else_=len(STATUS_OPTIONS)
-                )
-            ).all()
-            
-            row = 4
-            for skc in skcs:
-                ws.cell(row=row, column=col, value=skc.code)
-                ws.cell(row=row, column=col+1, value=skc.status)
-                row += 1
-            
-            col += 2
+        upload_id = uuid.uuid4().hex
+        ext = filename.rsplit('.', 1)[1].lower()
+        upload = UploadSession(
+            id=upload_id,
+            project_id=project_id,
+            user_id=current_user.id,
+            filename=filename,
+            file_path=create_upload_file(upload_id, ext),
+            total_size=size,
+            checksum=checksum
+        )
+        db.session.add(upload)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'upload': serialize_upload(upload)
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'创建上传失败: {str(e)}'}), 500
+
+@api_bp.route('/uploads/<upload_id>', methods=['GET'])
+@login_required
+def get_upload(upload_id):
+    """查询上传进度，断线后从 received 处继续上传"""
+    upload = get_upload_session(upload_id)
+    
+    if not upload:
+        return jsonify({'success': False, 'message': '上传不存在'}), 404
+    
+    return jsonify({
+        'success': True,
+        'upload': serialize_upload(upload)
+    })
+
+@api_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def put_upload_chunk(upload_id):
+    """上传分片：请求体为分片的原始数据，?offset= 必须等于已接收的字节数"""
+    upload = get_upload_session(upload_id)
+    
+    if not upload:
+        return jsonify({'success': False, 'message': '上传不存在'}), 404
+    
+    offset = request.args.get('offset', type=int)
+    length = request.content_length
+    
+    if offset != upload.received:
+        return jsonify({
+            'success': False,
+            'message': '分片偏移量不匹配',
+            'upload': serialize_upload(upload)
+        }), 409
+    
+    if not length or offset + length > upload.total_size:
+        return jsonify({'success': False, 'message': '分片大小无效'}), 400
+    
+    try:
+        received = write_chunk(upload.file_path, request.stream, offset, length)
         
-        # 保存文件
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        filename = f"{project.name}_{timestamp}.xlsx"
-        safe_filename = secure_filename(filename)
+        # 仅当期间没有其他请求写入时更新进度
+        result = db.session.execute(
+            db.update(UploadSession)
+            .where(UploadSession.id == upload.id, UploadSession.received == offset)
+            .values(received=received, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        db.session.refresh(upload)
         
-        export_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'exports')
-        os.makedirs(export_folder, exist_ok=True)
+        if result.rowcount != 1:
+            return jsonify({
+                'success': False,
+                'message': '分片偏移量不匹配',
+                'upload': serialize_upload(upload)
+            }), 409
         
-        file_path = os.path.join(export_folder, safe_filename)
-        wb.save(file_path)
+        if received != offset + length:
+            return jsonify({
+                'success': False,
+                'message': '分片不完整，请从已接收位置继续上传',
+                'upload': serialize_upload(upload)
+            }), 400
         
-        # 记录导出历史
-        file_size = os.path.getsize(file_path)
-        export_record = ExcelExport(
-            filename=safe_filename,
-            file_path=file_path,
+        return jsonify({
+            'success': True,
+            'upload': serialize_upload(upload)
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'上传失败: {str(e)}'}), 500
+
+@api_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_upload(upload_id):
+    """完成上传：校验文件大小和SHA-256后导入到项目，请求体可带 layout 和 mode"""
+    upload = get_upload_session(upload_id)
+    
+    if not upload:
+        return jsonify({'success': False, 'message': '上传不存在'}), 404
+    
+    project = Project.query.filter_by(
+        id=upload.project_id, 
+        user_id=current_user.id, 
+        is_active=True
+    ).first()
+    
+    if not project:
+        return jsonify({'success': False, 'message': '项目不存在'}), 404
+    
+    layout, mode, error = get_import_options(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    
+    if upload.received != upload.total_size or os.path.getsize(upload.file_path) != upload.total_size:
+        return jsonify({
+            'success': False,
+            'message': '文件尚未上传完成',
+            'upload': serialize_upload(upload)
+        }), 409
+    
+    checksum = file_sha256(upload.file_path)
+    if upload.checksum and checksum != upload.checksum:
+        # 校验失败时清空文件，需要重新上传
+        open(upload.file_path, 'wb').close()
+        upload.received = 0
+        db.session.commit()
+        return jsonify({
+            'success': False,
+            'message': '文件校验失败，请重新上传',
+            'upload': serialize_upload(upload)
+        }), 422
+    
+    # 删除上传会话后再导入，防止重复导入
+    file_path = upload.file_path
+    result = db.session.execute(
+        db.delete(UploadSession)
+        .where(UploadSession.id == upload.id, UploadSession.received == upload.total_size)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    
+    if result.rowcount != 1:
+        return jsonify({'success': False, 'message': '上传不存在'}), 404
+    
+    return run_import(project, file_path, layout, mode)
+
+@api_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def delete_upload(upload_id):
+    """取消上传"""
+    upload = get_upload_session(upload_id)
+    
+    if not upload:
+        return jsonify({'success': False, 'message': '上传不存在'}), 404
+    
+    try:
+        remove_upload_file(upload.file_path)
+        db.session.delete(upload)
+        db.session.commit()
+        
+        return jsonify({'success': True, 'message': '上传已取消'})
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'取消上传失败: {str(e)}'}), 500
+
+@api_bp.route('/projects/<int:project_id>/export', methods=['POST'])
+@login_required
+def export_project_excel(project_id):
+    """创建项目Excel导出任务，由后台执行，通过 /api/export_jobs/<id> 查询进度"""
+    project = Project.query.filter_by(
+        id=project_id, 
+        user_id=current_user.id, 
+        is_active=True
+    ).first()
+    
+    if not project:
+        return jsonify({'success': False, 'message': '项目不存在'}), 404
+    
+    try:
+        check_stale_jobs()
+        job = ExportJob(
             project_id=project_id,
             user_id=current_user.id,
-            file_size=file_size
+            trace_id=current_trace_id()
         )
-        
-        db.session.add(export_record)
+        db.session.add(job)
         db.session.commit()
         
+        enqueue_export_job(job.id)
+        
         return jsonify({
             'success': True,
-            'message': 'Excel导出成功',
-            'export': {
-                'id': export_record.id,
-                'filename': export_record.filename,
-                'created_at': export_record.created_at.isoformat(),
-                'file_size': export_record.file_size
-            }
-        })
+            'message': '导出任务已创建',
+            'job': serialize_job(job)
+        }), 202
     
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': f'导出失败: {str(e)}'}), 500
 
+@api_bp.route('/export_jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_export_job(job_id):
+    """查询导出任务状态"""
+    check_stale_jobs()
+    job = ExportJob.query.filter_by(
+        id=job_id,
+        user_id=current_user.id
+    ).first()
+    
+    if not job:
+        return jsonify({'success': False, 'message': '导出任务不存在'}), 404
+    
+    return jsonify({
+        'success': True,
+        'job': serialize_job(job)
+    })
+
 @api_bp.route('/exports/<int:export_id>/download')
 @login_required
 def download_export(export_id):
@@ -950,4 +1672,121 @@ def download_export(export_id):
         as_attachment=True,
         download_name=export.filename,
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
\ No newline at end of file
+    )
+
+@api_bp.route('/exports/bundle', methods=['POST'])
+@login_required
+def export_projects_bundle():
+    """将多个项目打包导出为zip（流式下载）
+    
+    请求体 {"project_ids": [...]}，为空时导出当前用户的所有项目。
+    每个项目的结果记录在压缩包内的 manifest.json 中
+    """
+    data = request.get_json(silent=True) or {}
+    project_ids = data.get('project_ids') or []
+    
+    if not isinstance(project_ids, list) or not all(isinstance(pid, int) for pid in project_ids):
+        return jsonify({'success': False, 'message': '项目ID列表格式错误'}), 400
+    
+    query = Project.query.filter_by(user_id=current_user.id, is_active=True)
+    if project_ids:
+        query = query.filter(Project.id.in_(project_ids))
+    projects = query.order_by(Project.id).all()
+    
+    if project_ids and len(projects) != len(set(project_ids)):
+        return jsonify({'success': False, 'message': '项目不存在'}), 404
+    
+    if not projects:
+        return jsonify({'success': False, 'message': '没有可导出的项目'}), 400
+    
+    max_workers = current_app.config['EXPORT_BUNDLE_WORKERS']
+    filename = f"projects_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    
+    def generate():
+        yield from iter_export_bundle(projects, max_workers)
+    
+    return stream_response(generate, 'application/zip', filename)
+
+# ========== 流式导出 API ==========
+
+# 流式导出的字段
+STREAM_EXPORT_COLUMNS = ('product', 'code', 'status', 'created_at', 'updated_at')
+
+def iter_project_skc_rows(project_id, batch_size=1000):
+    """通过服务端游标分批读取项目的所有SKC，内存占用与项目大小无关"""
+    stmt = db.select(
+        Product.name, SKC.code, SKC.status, SKC.created_at, SKC.updated_at
+    ).join(
+        Product, SKC.product_id == Product.id
+    ).where(
+        Product.project_id == project_id
+    ).order_by(
+        # 按商品逐个读取，每个商品内直接沿 idx_product_sort 索引顺序返回，数据库无需先排序整个项目
+        Product.id, SKC.sort_order, SKC.code
+    )
+    
+    result = db.session.execute(stmt, execution_options={'yield_per': batch_size})
+    for rows in result.partitions():
+        yield rows
+
+def get_stream_project(project_id):
+    """获取当前用户可流式导出的项目"""
+    return Project.query.filter_by(
+        id=project_id, 
+        user_id=current_user.id, 
+        is_active=True
+    ).first()
+
+def stream_response(generate, mimetype, filename=None):
+    """生成流式响应，禁用代理缓冲以便立即发送数据"""
+    response = current_app.response_class(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-store'
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+@api_bp.route('/projects/<int:project_id>/skcs.ndjson', methods=['GET'])
+@login_required
+def stream_project_skcs_ndjson(project_id):
+    """以NDJSON格式流式导出项目的所有SKC"""
+    project = get_stream_project(project_id)
+    
+    if not project:
+        return jsonify({'success': False, 'message': '项目不存在'}), 404
+    
+    dumps = current_app.json.dumps
+    
+    def generate():
+        for rows in iter_project_skc_rows(project.id):
+            yield ''.join(
+                dumps(dict(zip(STREAM_EXPORT_COLUMNS, row))) + '\n' for row in rows
+            )
+    
+    return stream_response(generate, 'application/x-ndjson')
+
+@api_bp.route('/projects/<int:project_id>/skcs.csv', methods=['GET'])
+@login_required
+def stream_project_skcs_csv(project_id):
+    """以CSV格式流式导出项目的所有SKC"""
+    project = get_stream_project(project_id)
+    
+    if not project:
+        return jsonify({'success': False, 'message': '项目不存在'}), 404
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(STREAM_EXPORT_COLUMNS)
+        yield buffer.getvalue()
+        
+        for rows in iter_project_skc_rows(project.id):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                (name, code, status, created_at.isoformat(), updated_at.isoformat())
+                for name, code, status, created_at, updated_at in rows
+            )
+            yield buffer.getvalue()
+    
+    return stream_response(generate, 'text/csv', f'project_{project.id}_skcs.csv')
@@ -1,10 +1,19 @@
 from flask import Flask, render_template, redirect, url_for, send_from_directory
 from flask_login import LoginManager, login_required, current_user
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config
-from models import db, User
+from models import db, init_database
 from auth import auth_bp
 from api import api_bp
 from cache import cache
+from responses import init_responses
+from profiler import init_profiler
+from metrics import init_metrics
+from user_cache import init_user_cache
+from availability import init_availability
+from tracing import init_tracing
+from slow_query import init_slow_query_log
+from jobs import init_jobs
 import os
 import redis
 
@@ -16,9 +25,19 @@ def create_app(config_name=None):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # 部署在反向代理之后时，从 X-Forwarded-For 读取客户端IP（用于按IP限制请求频率）
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    
     # 初始化扩展
     db.init_app(app)
     cache.init_app(app)
+    init_profiler(app)
+    init_metrics(app, db, cache)
+    init_tracing(app, db, cache)
+    init_slow_query_log(app, db)
+    init_responses(app)
+    init_jobs(app)
     
     # 配置登录管理
     login_manager = LoginManager()
@@ -27,9 +46,10 @@ def create_app(config_name=None):
     login_manager.login_message = '请先登录'
     login_manager.login_message_category = 'info'
     
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    # 登录用户从进程内缓存和Redis读取，不再每个请求查询用户表
+    init_user_cache(login_manager)
+    # 注册、修改用户后更新用户名/邮箱可用性检查使用的集合
+    init_availability()
     
     # 注册蓝图
     app.register_blueprint(auth_bp)
@@ -65,30 +85,12 @@ def create_app(config_name=None):
         db.session.rollback()
         return render_template('errors/500.html'), 500
     
-    # 创建数据库表
-    with app.app_context():
-        db.create_all()
-        
-        # 创建默认管理员用户（仅在开发环境）
-        if config_name == 'development':
-            admin = User.query.filter_by(username='admin').first()
-            if not admin:
-                admin = User(
-                    username='admin',
-                    email='admin@example.com',
-                    is_admin=True
-                )
-                admin.set_password('admin123')
-                db.session.add(admin)
-                db.session.commit()
+    # 开发环境启动时自动建表；生产环境在部署时执行一次 migrate.py，工作进程启动时不再检查表结构
+    if app.config['AUTO_MIGRATE']:
+        with app.app_context():
+            if init_database(create_admin=config_name == 'development'):
                 print("创建默认管理员用户: admin / admin123")
     
-    # 创建上传目录
-    upload_folder = app.config['UPLOAD_FOLDER']
-    for subfolder in ['images', 'exports', 'temp']:
-        folder_path = os.path.join(upload_folder, subfolder)
-        os.makedirs(folder_path, exist_ok=True)
-    
     return app
 
 # 主程序入口
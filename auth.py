@@ -2,11 +2,16 @@ from flask import Blueprint, render_template, request, flash, redirect, url_for,
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.urls import url_parse
 from models import db, User
+from cache import rate_limit
+from availability import check_taken
 from datetime import datetime
 import re
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+# 每个IP每分钟最多的用户名/邮箱可用性检查次数
+CHECK_RATE_LIMIT = 60
+
 def validate_email(email):
     """验证邮箱格式"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -200,11 +205,12 @@ def profile():
                 flash(error, 'error')
             return render_template('auth/profile.html')
         
-        # 更新用户信息
+        # 更新用户信息（current_user 为缓存的用户信息，修改完整的用户记录）
         try:
-            current_user.email = email
+            user = current_user.model
+            user.email = email
             if new_password:
-                current_user.set_password(new_password)
+                user.set_password(new_password)
             db.session.commit()
             
             if request.is_json:
@@ -219,34 +225,65 @@ def profile():
     
     return render_template('auth/profile.html')
 
+def client_rate_key(*args, **kwargs):
+    """按客户端IP限制可用性检查的请求频率（三个检查接口共用）"""
+    return f"rate_limit:check_availability:{request.remote_addr}"
+
+def username_status(username, taken):
+    if not username:
+        return {'available': False, 'message': '用户名不能为空'}
+    if len(username) < 3:
+        return {'available': False, 'message': '用户名长度至少3位'}
+    if taken:
+        return {'available': False, 'message': '用户名已存在'}
+    return {'available': True, 'message': '用户名可用'}
+
+def email_status(email, taken):
+    if not email:
+        return {'available': False, 'message': '邮箱不能为空'}
+    if not validate_email(email):
+        return {'available': False, 'message': '邮箱格式不正确'}
+    if taken:
+        return {'available': False, 'message': '邮箱已被注册'}
+    return {'available': True, 'message': '邮箱可用'}
+
+def lookup_taken(username=None, email=None):
+    """只查询格式正确的值是否已被使用"""
+    values = {}
+    if username and len(username) >= 3:
+        values['username'] = username
+    if email and validate_email(email):
+        values['email'] = email
+    return check_taken(values) if values else {}
+
 @auth_bp.route('/check_username')
+@rate_limit(limit=CHECK_RATE_LIMIT, window=60, key_func=client_rate_key)
 def check_username():
     """检查用户名是否可用"""
     username = request.args.get('username', '').strip()
-    if not username:
-        return jsonify({'available': False, 'message': '用户名不能为空'})
-    
-    if len(username) < 3:
-        return jsonify({'available': False, 'message': '用户名长度至少3位'})
-    
-    user = User.query.filter_by(username=username).first()
-    if user:
-        return jsonify({'available': False, 'message': '用户名已存在'})
-    
-    return jsonify({'available': True, 'message': '用户名可用'})
+    taken = lookup_taken(username=username)
+    return jsonify(username_status(username, taken.get('username')))
 
 @auth_bp.route('/check_email')
+@rate_limit(limit=CHECK_RATE_LIMIT, window=60, key_func=client_rate_key)
 def check_email():
     """检查邮箱是否可用"""
     email = request.args.get('email', '').strip()
-    if not email:
-        return jsonify({'available': False, 'message': '邮箱不能为空'})
-    
-    if not validate_email(email):
-        return jsonify({'available': False, 'message': '邮箱格式不正确'})
-    
-    user = User.query.filter_by(email=email).first()
-    if user:
-        return jsonify({'available': False, 'message': '邮箱已被注册'})
-    
-    return jsonify({'available': True, 'message': '邮箱可用'})
\ No newline at end of file
+    taken = lookup_taken(email=email)
+    return jsonify(email_status(email, taken.get('email')))
+
+@auth_bp.route('/check_availability')
+@rate_limit(limit=CHECK_RATE_LIMIT, window=60, key_func=client_rate_key)
+def check_availability():
+    """一次检查用户名和邮箱是否可用（只返回请求中包含的字段）"""
+    result = {}
+    taken = lookup_taken(
+        username=request.args.get('username', '').strip(),
+        email=request.args.get('email', '').strip()
+    )
+    if 'username' in request.args:
+        result['username'] = username_status(request.args['username'].strip(), taken.get('username'))
+    if 'email' in request.args:
+        result['email'] = email_status(request.args['email'].strip(), taken.get('email'))
+    result['available'] = bool(result) and all(item['available'] for item in result.values())
+    return jsonify(result)
@@ -0,0 +1,142 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+from models import db, User
+from cache import cache
+
+# 注册时需要检查是否已被使用的字段
+FIELDS = ('username', 'email')
+
+# Redis集合中的占位成员，没有用户时集合也存在
+PLACEHOLDER = ''
+
+# 每次SADD的成员数
+SADD_CHUNK = 1000
+
+# Redis不可用时的进程内集合：{'expires': 过期时间, 'username': set(), 'email': set()}
+_local = {'expires': 0, 'username': set(), 'email': set()}
+_local_lock = threading.Lock()
+
+def redis_key(name):
+    return cache._get_key(f'availability:{name}')
+
+def load_taken():
+    """一次查询读取所有已使用的用户名和邮箱"""
+    taken = {field: set() for field in FIELDS}
+    for username, email in db.session.query(User.username, User.email):
+        taken['username'].add(username)
+        taken['email'].add(email)
+    return taken
+
+def rebuild_redis(taken):
+    """重建Redis集合：在事务中写入临时键后重命名，读取时不会看到不完整的集合"""
+    ttl = current_app.config['AVAILABILITY_CACHE_TTL']
+    pipe = cache.redis_client.pipeline()
+    for field in FIELDS:
+        building = redis_key(f'{field}:building')
+        members = [PLACEHOLDER, *taken[field]]
+        pipe.delete(building)
+        for i in range(0, len(members), SADD_CHUNK):
+            pipe.sadd(building, *members[i:i + SADD_CHUNK])
+        # 集合比加载标记晚过期，标记过期后重建前仍可读取
+        pipe.expire(building, ttl + 60)
+        pipe.rename(building, redis_key(field))
+    pipe.setex(redis_key('loaded'), ttl, 1)
+    pipe.execute()
+
+def check_redis(values):
+    pipe = cache.redis_client.pipeline(transaction=False)
+    pipe.exists(redis_key('loaded'))
+    for field, value in values.items():
+        pipe.sismember(redis_key(field), value)
+    loaded, *members = pipe.execute()
+    if loaded:
+        return {field: bool(member) for field, member in zip(values, members)}
+    
+    taken = load_taken()
+    rebuild_redis(taken)
+    return {field: value in taken[field] for field, value in values.items()}
+
+def check_local(values):
+    with _local_lock:
+        if _local['expires'] <= time.monotonic():
+            _local.update(load_taken(), expires=time.monotonic() + current_app.config['AVAILABILITY_LOCAL_TTL'])
+        return {field: value in _local[field] for field, value in values.items()}
+
+def check_taken(values):
+    """检查用户名/邮箱是否已被使用，values 为 {字段: 值}，返回 {字段: 是否已使用}
+    
+    优先读取Redis集合，Redis不可用时使用定期刷新的进程内集合。
+    结果只用于注册表单的提示，注册时仍以数据库查询为准
+    """
+    if cache.redis_client:
+        try:
+            return check_redis(values)
+        except Exception as e:
+            current_app.logger.error(f"用户名/邮箱集合读取失败: {e}")
+    return check_local(values)
+
+def apply_changes(changes):
+    """提交后更新进程内集合和Redis集合"""
+    with _local_lock:
+        if _local['expires'] > time.monotonic():
+            for op, field, value in changes:
+                if op == 'add':
+                    _local[field].add(value)
+                else:
+                    _local[field].discard(value)
+    
+    if not cache.redis_client:
+        return
+    try:
+        pipe = cache.redis_client.pipeline()
+        for op, field, value in changes:
+            if op == 'add':
+                pipe.sadd(redis_key(field), value)
+            else:
+                pipe.srem(redis_key(field), value)
+        pipe.execute()
+    except Exception as e:
+        current_app.logger.error(f"用户名/邮箱集合更新失败: {e}")
+        # 删除加载标记，下次检查时从数据库重建
+        cache.delete('availability:loaded')
+
+def session_changes(target):
+    return object_session(target).info.setdefault('availability_changes', [])
+
+def track_insert(mapper, connection, target):
+    """注册的新用户在提交后加入集合"""
+    session_changes(target).extend(('add', field, getattr(target, field)) for field in FIELDS)
+
+def track_update(mapper, connection, target):
+    """修改用户名或邮箱后，旧值移出集合、新值加入集合（登录时间等其他修改不处理）"""
+    state = inspect(target)
+    changes = session_changes(target)
+    for field in FIELDS:
+        history = state.attrs[field].history
+        if history.has_changes():
+            changes.extend(('remove', field, value) for value in history.deleted if value is not None)
+            changes.extend(('add', field, value) for value in history.added if value is not None)
+
+def track_delete(mapper, connection, target):
+    session_changes(target).extend(('remove', field, getattr(target, field)) for field in FIELDS)
+
+def apply_session_changes(session):
+    changes = session.info.pop('availability_changes', None)
+    if changes:
+        apply_changes(changes)
+
+def discard_session_changes(session, previous_transaction):
+    session.info.pop('availability_changes', None)
+
+def init_availability():
+    """注册用户记录的事件，注册、修改和删除用户后更新已使用的用户名/邮箱集合"""
+    if event.contains(User, 'after_insert', track_insert):
+        return
+    event.listen(User, 'after_insert', track_insert)
+    event.listen(User, 'after_update', track_update)
+    event.listen(User, 'before_delete', track_delete)
+    event.listen(db.session, 'after_commit', apply_session_changes)
+    event.listen(db.session, 'after_soft_rollback', discard_session_changes)
@@ -0,0 +1,4 @@
+"""
+性能基准测试脚本
+使用方式: python -m benchmarks.<模块名>
+"""
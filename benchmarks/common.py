@@ -0,0 +1,51 @@
+"""
+基准测试公共工具：创建独立的测试应用、注册并登录用户
+"""
+
+import os
+
+def create_bench_app(folder, database_url=None, name='benchmark', **overrides):
+    """使用独立的数据库和上传目录创建应用
+    
+    database_url 为空时在 folder 中创建SQLite数据库；overrides 覆盖其他配置项
+    """
+    database_url = database_url or f"sqlite:///{os.path.join(folder, f'{name}.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('REDIS_URL', 'redis://localhost:1/0')
+    
+    from config import config, DevelopmentConfig
+    from app import create_app
+    
+    settings = {
+        'DEBUG': False,
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'UPLOAD_FOLDER': os.path.join(folder, 'uploads'),
+        'JOB_RUNNER': 'worker',  # 导出任务由脚本同步执行
+        'EXPORT_BUNDLE_WORKERS': 1,
+        'METRICS_ENABLED': False,
+    }
+    settings.update(overrides)
+    config[name] = type(f'{name.title()}Config', (DevelopmentConfig,), settings)
+    return create_app(name)
+
+def login(client, username, password='bench123'):
+    """注册（已存在时忽略）并登录用户"""
+    client.post('/auth/register', json={
+        'username': username, 'email': f'{username}@example.com',
+        'password': password, 'confirm_password': password
+    })
+    response = client.post('/auth/login', json={'username': username, 'password': password})
+    if not response.json.get('success'):
+        raise RuntimeError(f'登录失败: {response.json}')
+
+def run_export_job(app, job_id=None):
+    """同步执行导出任务（默认最近创建的任务），返回任务ID"""
+    from models import ExportJob
+    from jobs import claim_job, run_export_job as execute
+    
+    with app.app_context():
+        if job_id is None:
+            job_id = ExportJob.query.order_by(ExportJob.id.desc()).first().id
+        claim_job(job_id)
+        execute(job_id)
+    return job_id
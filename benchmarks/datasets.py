@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+合成测试数据生成
+按规模生成用户、项目、产品、SKC和图片记录，以及导入格式的大型Excel/CSV文件
+
+使用方式: python -m benchmarks.datasets --scale medium [--database-url URL] [--workbook out.xlsx]
+"""
+
+import argparse
+import csv
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+# 数据规模预设：用户数、每个用户的项目数、每个项目的产品数、每个产品的SKC数、每个产品的图片数
+SCALES = {
+    'tiny': {'users': 1, 'projects': 2, 'products': 20, 'skcs': 10, 'images': 1},
+    'small': {'users': 1, 'projects': 3, 'products': 200, 'skcs': 20, 'images': 1},
+    'medium': {'users': 2, 'projects': 5, 'products': 2000, 'skcs': 50, 'images': 2},
+    'large': {'users': 2, 'projects': 5, 'products': 4000, 'skcs': 100, 'images': 2},
+}
+
+# 每批插入的行数
+INSERT_BATCH = 10000
+
+# 状态分布（与实际数据接近：大部分核价通过）
+STATUS_WEIGHTS = {
+    '核价通过': 55, '拉过库存': 15, '价格待定': 10, '改过体积': 6,
+    '价格错误': 4, '减少库存为0': 5, '已下架': 5,
+}
+
+PRODUCT_WORDS = ['连衣裙', 'T恤', '卫衣', '牛仔裤', '外套', '衬衫', '半身裙', '运动裤', '针织衫', '背心']
+PRODUCT_STYLES = ['宽松', '修身', '复古', '基础款', '印花', '纯色', '条纹', '格纹']
+
+def product_name(rng, index):
+    """生成产品名"""
+    return f"{rng.choice(PRODUCT_STYLES)}{rng.choice(PRODUCT_WORDS)}-{index:05d}"
+
+def skc_statuses(rng, count):
+    """按状态分布随机生成状态"""
+    return rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=count)
+
+def create_image_files(folder, count=8):
+    """生成少量图片文件，由所有图片记录共用（避免生成上百万个文件）"""
+    from PIL import Image
+    
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f'bench_{i}.jpg')
+        if not os.path.exists(path):
+            color = ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256)
+            Image.new('RGB', (800, 800), color).save(path, 'JPEG', quality=85)
+        paths.append(path)
+    return paths
+
+def insert_rows(model, rows):
+    """分批插入"""
+    from models import db
+    
+    for start in range(0, len(rows), INSERT_BATCH):
+        db.session.execute(db.insert(model), rows[start:start + INSERT_BATCH])
+
+def generate_dataset(app, scale, prefix='bench', seed=42):
+    """生成数据集，返回 {'users': [用户名], 'projects': [项目ID], 'rows': {...}, 'seconds': 耗时}
+    
+    prefix 用于区分多次生成的数据（SKC代码全局唯一）；用户密码均为 bench123
+    """
+    from models import db, User, Project, Product, SKC, ProductImage, AUTO_SORT_PRIORITY, status_sort_order
+    
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    counts = {'users': 0, 'projects': 0, 'products': 0, 'skcs': 0, 'images': 0}
+    usernames = []
+    project_ids = []
+    
+    with app.app_context():
+        image_paths = create_image_files(os.path.join(app.config['UPLOAD_FOLDER'], 'images'))
+        base_time = datetime.utcnow() - timedelta(days=90)
+        
+        for u in range(scale['users']):
+            username = f'{prefix}_user{u}'
+            user = User.query.filter_by(username=username).first()
+            if not user:
+                user = User(username=username, email=f'{username}@example.com')
+                user.set_password('bench123')
+                db.session.add(user)
+                db.session.flush()
+                counts['users'] += 1
+            usernames.append(username)
+            
+            for p in range(scale['projects']):
+                project = Project(name=f'{prefix}-季度{p + 1}', description='合成测试数据', user_id=user.id)
+                db.session.add(project)
+                db.session.flush()
+                project_ids.append(project.id)
+                counts['projects'] += 1
+                
+                names = [product_name(rng, i) for i in range(scale['products'])]
+                insert_rows(Product, [{
+                    'name': name,
+                    'project_id': project.id,
+                    'created_at': base_time + timedelta(minutes=i),
+                    'updated_at': base_time + timedelta(minutes=i)
+                } for i, name in enumerate(names)])
+                product_ids = db.session.scalars(
+                    db.select(Product.id).where(Product.project_id == project.id).order_by(Product.id)
+                ).all()
+                counts['products'] += len(product_ids)
+                
+                # 按产品分批生成SKC，避免一次性占用过多内存
+                batch = []
+                for index, product_id in enumerate(product_ids):
+                    statuses = skc_statuses(rng, scale['skcs'])
+                    created_at = base_time + timedelta(minutes=index)
+                    batch.extend({
+                        'code': f'{prefix}{u}{p}-{product_id}-{i:03d}',
+                        'status': status,
+                        'product_id': product_id,
+                        'sort_order': status_sort_order(status, AUTO_SORT_PRIORITY),
+                        'created_at': created_at,
+                        'updated_at': created_at
+                    } for i, status in enumerate(statuses))
+                    if len(batch) >= INSERT_BATCH:
+                        insert_rows(SKC, batch)
+                        counts['skcs'] += len(batch)
+                        batch = []
+                if batch:
+                    insert_rows(SKC, batch)
+                    counts['skcs'] += len(batch)
+                
+                images = []
+                for product_id in product_ids:
+                    for i in range(scale['images']):
+                        path = rng.choice(image_paths)
+                        images.append({
+                            'filename': os.path.basename(path),
+                            'original_filename': os.path.basename(path),
+                            'file_path': path,
+                            'file_size': os.path.getsize(path),
+                            'mime_type': 'image/jpeg',
+                            'product_id': product_id,
+                            'uploaded_at': base_time,
+                            'is_primary': i == 0
+                        })
+                insert_rows(ProductImage, images)
+                counts['images'] += len(images)
+                db.session.commit()
+    
+    return {
+        'users': usernames,
+        'projects': project_ids,
+        'rows': counts,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+def iter_import_products(products, skcs_per_product, prefix='imp', seed=7):
+    """生成导入数据：[(产品名, [(SKC代码, 状态), ...]), ...]"""
+    rng = random.Random(seed)
+    for p in range(products):
+        statuses = skc_statuses(rng, skcs_per_product)
+        yield product_name(rng, p), [(f'{prefix}-{p:05d}-{i:04d}', status) for i, status in enumerate(statuses)]
+
+def write_import_workbook(file_path, products, skcs_per_product, prefix='imp', sheets=1):
+    """生成导入格式的Excel：每两列一个产品，第1行产品名，第3行表头，第4行起为SKC和状态
+    
+    使用只写模式按行写入，products 个产品平均分配到 sheets 个工作表
+    """
+    from openpyxl import Workbook
+    
+    wb = Workbook(write_only=True)
+    data = list(iter_import_products(products, skcs_per_product, prefix))
+    per_sheet = -(-len(data) // sheets)
+    for s in range(sheets):
+        chunk = data[s * per_sheet:(s + 1) * per_sheet]
+        if not chunk:
+            break
+        ws = wb.create_sheet(f'Sheet{s + 1}')
+        ws.append([cell for name, _ in chunk for cell in (name, None)])
+        ws.append([])
+        ws.append([cell for _ in chunk for cell in ('SKC', '状态')])
+        for row in range(skcs_per_product):
+            ws.append([cell for _, skcs in chunk for cell in skcs[row]])
+    wb.save(file_path)
+    return file_path
+
+def write_import_csv(file_path, products, skcs_per_product, prefix='imp'):
+    """生成长格式CSV（产品,SKC,状态）"""
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['product', 'skc', 'status'])
+        for name, skcs in iter_import_products(products, skcs_per_product, prefix):
+            writer.writerows((name, code, status) for code, status in skcs)
+    return file_path
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成测试数据')
+    parser.add_argument('--scale', choices=SCALES, default='small', help='数据规模')
+    parser.add_argument('--database-url', help='目标数据库（默认使用 DATABASE_URL 配置）')
+    parser.add_argument('--prefix', default='bench', help='数据前缀（SKC代码全局唯一，重复生成时需更换）')
+    parser.add_argument('--workbook', help='同时生成导入格式的Excel文件')
+    parser.add_argument('--csv', help='同时生成长格式CSV文件')
+    parser.add_argument('--import-products', type=int, default=1000, help='导入文件的产品数')
+    parser.add_argument('--import-skcs', type=int, default=100, help='导入文件每个产品的SKC数')
+    args = parser.parse_args()
+    
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app
+    
+    scale = SCALES[args.scale]
+    print(f"🧪 生成 {args.scale} 数据集: {scale}")
+    result = generate_dataset(create_app(), scale, args.prefix)
+    print(f"✅ 完成，用时 {result['seconds']}s: {result['rows']}")
+    print(f"   用户: {', '.join(result['users'])}（密码 bench123）")
+    
+    if args.workbook:
+        write_import_workbook(args.workbook, args.import_products, args.import_skcs, f'{args.prefix}imp')
+        print(f"📄 Excel: {args.workbook}")
+    if args.csv:
+        write_import_csv(args.csv, args.import_products, args.import_skcs, f'{args.prefix}imp')
+        print(f"📄 CSV: {args.csv}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+JSON响应序列化与压缩基准测试
+对比标准库JSON与orjson序列化10k SKC列表响应的耗时，以及gzip/br压缩后的传输字节数
+
+使用方式: python -m benchmarks.json_response [--count 10000] [--repeat 20]
+"""
+
+import argparse
+import gzip
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from models import STATUS_OPTIONS
+from responses import JSONProvider, OrjsonProvider, orjson, brotli
+
+def build_payload(count):
+    """构造与 get_skcs 相同结构的响应数据"""
+    now = datetime.utcnow()
+    return {
+        'success': True,
+        'skcs': [{
+            'id': i,
+            'code': f'SKC{i:08d}',
+            'status': STATUS_OPTIONS[i % len(STATUS_OPTIONS)],
+            'created_at': now - timedelta(seconds=i),
+            'updated_at': now
+        } for i in range(count)],
+        'pagination': {'page': 1, 'pages': 1, 'per_page': count, 'total': count},
+        'status_options': STATUS_OPTIONS
+    }
+
+def with_isoformat(payload):
+    """旧实现：逐行调用 isoformat() 后交给标准库jsonify"""
+    return dict(payload, skcs=[
+        dict(s, created_at=s['created_at'].isoformat(), updated_at=s['updated_at'].isoformat())
+        for s in payload['skcs']
+    ])
+
+def measure(app, provider, payload, repeat, prepare=None):
+    """返回 (每次平均耗时毫秒, 响应字节数)"""
+    app.json = provider
+    timings = []
+    body = b''
+    with app.app_context():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = prepare(payload) if prepare else payload
+            body = provider.response(data).get_data()
+            timings.append(time.perf_counter() - start)
+    return sum(timings) / len(timings) * 1000, body
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON响应序列化基准测试')
+    parser.add_argument('--count', type=int, default=10000, help='SKC数量')
+    parser.add_argument('--repeat', type=int, default=20, help='重复次数')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    payload = build_payload(args.count)
+
+    cases = [
+        ('stdlib jsonify + isoformat()', DefaultJSONProvider(app), with_isoformat),
+        ('JSONProvider (标准库)', JSONProvider(app), None),
+    ]
+    if orjson:
+        cases.append(('OrjsonProvider', OrjsonProvider(app), None))
+    else:
+        print('⚠️ 未安装orjson，跳过OrjsonProvider')
+
+    print(f"📊 {args.count} 个SKC，重复 {args.repeat} 次")
+    print(f"{'实现':<32}{'耗时(ms)':>10}{'原始字节':>12}{'gzip字节':>12}{'br字节':>12}{'gzip(ms)':>10}")
+    for name, provider, prepare in cases:
+        elapsed, body = measure(app, provider, payload, args.repeat, prepare)
+
+        start = time.perf_counter()
+        gzipped = gzip.compress(body, compresslevel=6)
+        gzip_ms = (time.perf_counter() - start) * 1000
+        br_size = len(brotli.compress(body, quality=4)) if brotli else '-'
+
+        print(f"{name:<32}{elapsed:>10.1f}{len(body):>12}{len(gzipped):>12}{br_size:>12}{gzip_ms:>10.1f}")
+
+if __name__ == '__main__':
+    main()
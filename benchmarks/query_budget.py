@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+API查询数量检查（N+1检测）
+在不同规模的测试数据上调用各个API，统计每次请求执行的SQL语句数。
+语句数随数据量增长（N+1）或超过预算时返回非0退出码，可在提交前或CI中运行
+
+使用方式: python -m benchmarks.query_budget [--sizes 3 12] [--json results.json]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from sqlalchemy import event
+from benchmarks.common import create_bench_app, login, run_export_job
+
+# 每个用例：(名称, 方法, URL, 请求参数, SQL语句数预算)
+# URL和请求参数中的 {key} 从测试数据上下文中取值，请求参数为函数时以上下文调用
+CASES = [
+    ('get_projects', 'GET', '/api/projects', None, 6),
+    ('get_projects_cursor', 'GET', '/api/projects?cursor=', None, 6),
+    ('get_products', 'GET', '/api/projects/{project_id}/products', None, 8),
+    ('get_products_cursor', 'GET', '/api/projects/{project_id}/products?cursor=', None, 8),
+    ('get_skcs', 'GET', '/api/products/{product_id}/skcs', None, 8),
+    ('get_skcs_cursor', 'GET', '/api/products/{product_id}/skcs?cursor=', None, 8),
+    ('get_product_images', 'GET', '/api/products/{product_id}/images', None, 6),
+    ('upload_product_image', 'POST', '/api/products/{product_id}/images',
+     lambda ctx: {'data': {'image': (io.BytesIO(ctx['png']), 'budget.png')}}, 8),
+    ('get_user_stats', 'GET', '/api/stats/user', None, 8),
+    ('create_project', 'POST', '/api/projects', lambda ctx: {'json': {'name': 'budget-new'}}, 6),
+    ('update_project', 'PUT', '/api/projects/{project_id}',
+     lambda ctx: {'json': {'name': 'budget-main', 'description': 'updated'}}, 6),
+    ('create_product', 'POST', '/api/projects/{project_id}/products',
+     lambda ctx: {'json': {'name': 'budget-product'}}, 6),
+    ('add_skcs', 'POST', '/api/products/{product_id}/skcs',
+     lambda ctx: {'json': {'skc_codes': [f"{ctx['prefix']}NEW{i}" for i in range(ctx['size'])], 'status': '核价通过'}}, 8),
+    ('batch_update_skcs', 'PUT', '/api/skcs/batch_update',
+     lambda ctx: {'json': {'skc_codes': ctx['codes'], 'status': '已下架'}}, 8),
+    ('batch_move_skcs', 'PUT', '/api/skcs/batch_move',
+     lambda ctx: {'json': {'skc_codes': ctx['move_codes'], 'target_product_id': ctx['target_product_id']}}, 10),
+    ('auto_sort', 'POST', '/api/projects/{project_id}/auto_sort', None, 8),
+    ('set_primary_image', 'PUT', '/api/images/{image_id}/primary', None, 8),
+    ('duplicate_project', 'POST', '/api/projects/{project_id}/duplicate',
+     lambda ctx: {'json': {'name': 'budget-copy', 'include_skcs': True, 'code_prefix': 'COPY-'}}, 12),
+    ('import_csv', 'POST', '/api/projects/{project_id}/import',
+     lambda ctx: {'data': {'excel': (io.BytesIO(ctx['csv']), 'import.csv')}}, 14),
+    ('create_upload', 'POST', '/api/projects/{project_id}/uploads',
+     lambda ctx: {'json': {'filename': 'upload.csv', 'size': len(ctx['upload_csv']),
+                           'sha256': hashlib.sha256(ctx['upload_csv']).hexdigest()}}, 6),
+    ('put_upload_chunk', 'PUT', '/api/uploads/{upload_id}?offset=0',
+     lambda ctx: {'data': ctx['upload_csv']}, 6),
+    ('get_upload', 'GET', '/api/uploads/{upload_id}', None, 4),
+    ('complete_upload', 'POST', '/api/uploads/{upload_id}/complete', lambda ctx: {'json': {}}, 16),
+    ('delete_upload', 'DELETE', '/api/uploads/{cancel_upload_id}', None, 6),
+    ('export_project', 'POST', '/api/projects/{project_id}/export', None, 6),
+    ('export_job', 'JOB', None, None, 12),
+    ('get_export_job', 'GET', '/api/export_jobs/{job_id}', None, 6),
+    ('download_export', 'GET', '/api/exports/{export_id}/download', None, 4),
+    ('stream_ndjson', 'GET', '/api/projects/{project_id}/skcs.ndjson', None, 6),
+    ('stream_csv', 'GET', '/api/projects/{project_id}/skcs.csv', None, 6),
+    ('export_bundle', 'POST', '/api/exports/bundle',
+     lambda ctx: {'json': {'project_ids': [ctx['project_id']]}}, 10),
+    ('batch_delete_skcs', 'DELETE', '/api/skcs/batch_delete',
+     lambda ctx: {'json': {'skc_codes': ctx['delete_codes']}}, 8),
+    ('delete_image', 'DELETE', '/api/images/{image_id}', None, 8),
+    ('delete_project', 'DELETE', '/api/projects/{project_id}', None, 6),
+]
+
+# 从响应中记录后续用例使用的ID
+CAPTURES = {
+    'create_upload': lambda ctx, data: ctx.update(upload_id=data['upload']['id']),
+    'get_export_job': lambda ctx, data: ctx.update(export_id=data['job']['export']['id']),
+}
+
+class QueryCounter:
+    """统计数据库引擎执行的SQL语句"""
+    
+    def __init__(self, engine):
+        self.count = 0
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+    
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+    
+    def reset(self):
+        self.count = 0
+        self.statements = []
+
+def seed(app, client, size):
+    """创建一个用户及 size 个项目，主项目有 size 个产品，每个产品 size 个SKC和1张图片"""
+    from PIL import Image
+    from models import db, Project, Product, SKC, ProductImage, UploadSession, STATUS_OPTIONS, AUTO_SORT_PRIORITY, status_sort_order
+    from chunked_upload import create_upload_file
+    
+    username = f'budget{size}'
+    login(client, username)
+    
+    prefix = f'S{size}-'
+    with app.app_context():
+        from models import User
+        user_id = User.query.filter_by(username=username).one().id
+        now = datetime.utcnow()
+        
+        projects = [Project(name=f'budget-{i}', user_id=user_id) for i in range(size)]
+        db.session.add_all(projects)
+        db.session.flush()
+        project = projects[0]
+        
+        products = [Product(name=f'product-{i}', project_id=project.id) for i in range(size + 1)]
+        db.session.add_all(products)
+        db.session.flush()
+        target_product = products.pop()
+        
+        rows = []
+        for p, product in enumerate(products):
+            for i in range(size):
+                status = STATUS_OPTIONS[(p + i) % len(STATUS_OPTIONS)]
+                rows.append({
+                    'code': f'{prefix}{p}-{i}',
+                    'status': status,
+                    'product_id': product.id,
+                    'sort_order': status_sort_order(status, AUTO_SORT_PRIORITY),
+                    'created_at': now,
+                    'updated_at': now
+                })
+        db.session.execute(db.insert(SKC), rows)
+        
+        image_folder = os.path.join(app.config['UPLOAD_FOLDER'], 'images')
+        os.makedirs(image_folder, exist_ok=True)
+        images = []
+        for product in products:
+            file_path = os.path.join(image_folder, f'budget_{product.id}.png')
+            Image.new('RGB', (200, 200), (200, 80, 80)).save(file_path)
+            images.append(ProductImage(
+                filename=os.path.basename(file_path), original_filename='budget.png',
+                file_path=file_path, file_size=os.path.getsize(file_path),
+                mime_type='image/png', product_id=product.id, is_primary=False
+            ))
+        db.session.add_all(images)
+        
+        # 用于取消上传用例的上传会话
+        cancel_upload = UploadSession(
+            id=f'budget{size}', project_id=project.id, user_id=user_id, filename='cancel.csv',
+            file_path=create_upload_file(f'budget{size}', 'csv'), total_size=100
+        )
+        db.session.add(cancel_upload)
+        db.session.commit()
+        
+        png = io.BytesIO()
+        Image.new('RGB', (200, 200), (80, 80, 200)).save(png, 'PNG')
+        
+        codes = [f'{prefix}{p}-{i}' for p in range(size) for i in range(size)]
+        csv_rows = ['product,skc,status'] + [
+            f'imported-{i % size},{prefix}IMP{i},核价通过' for i in range(size * size)
+        ]
+        return {
+            'size': size,
+            'prefix': prefix,
+            'project_id': project.id,
+            'product_id': products[0].id,
+            'target_product_id': target_product.id,
+            'image_id': images[0].id,
+            'codes': codes,
+            'move_codes': codes[:size],
+            'delete_codes': codes[size:],
+            'csv': '\n'.join(csv_rows).encode('utf-8'),
+            'upload_csv': '\n'.join(['product,skc,status'] + [
+                f'uploaded-{i % size},{prefix}UPL{i},核价通过' for i in range(size * size)
+            ]).encode('utf-8'),
+            'png': png.getvalue(),
+            'cancel_upload_id': cancel_upload.id,
+            'upload_id': None,
+            'job_id': None,
+            'export_id': None
+        }
+
+def run_case(app, client, counter, ctx, name, method, url, kwargs):
+    """执行一个用例，返回 (状态码, SQL语句数)"""
+    counter.reset()
+    if method == 'JOB':
+        ctx['job_id'] = run_export_job(app)
+        return 200, counter.count
+    
+    url = url.format(**ctx)
+    options = kwargs(ctx) if kwargs else {}
+    response = client.open(url, method=method, **options)
+    response.get_data()  # 流式响应需要读取完毕才会执行全部查询
+    count = counter.count
+    if name in CAPTURES and response.status_code < 400:
+        CAPTURES[name](ctx, response.get_json())
+    return response.status_code, count
+
+def main():
+    parser = argparse.ArgumentParser(description='API查询数量检查（N+1检测）')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 12], help='测试数据规模（至少两个）')
+    parser.add_argument('--json', help='将结果写入JSON文件')
+    parser.add_argument('--verbose', action='store_true', help='输出超出预算用例的SQL语句')
+    args = parser.parse_args()
+    
+    sizes = sorted(set(args.sizes))
+    if len(sizes) < 2:
+        parser.error('至少需要两个不同的数据规模')
+    
+    folder = tempfile.mkdtemp(prefix='query_budget_')
+    try:
+        app = create_bench_app(folder, name='query_budget')
+        with app.app_context():
+            from models import db
+            counter = QueryCounter(db.engine)
+        
+        results = {name: {'budget': budget, 'counts': {}, 'status': {}} for name, _, _, _, budget in CASES}
+        statements = {}
+        for size in sizes:
+            client = app.test_client()
+            ctx = seed(app, client, size)
+            for name, method, url, kwargs, budget in CASES:
+                status, count = run_case(app, client, counter, ctx, name, method, url, kwargs)
+                results[name]['counts'][size] = count
+                results[name]['status'][size] = status
+                statements[name] = list(counter.statements)
+        
+        failures = 0
+        print(f"📊 数据规模: {', '.join(str(size) for size in sizes)}")
+        print(f"{'接口':<24}{'预算':>6}" + ''.join(f'{f"n={size}":>8}' for size in sizes) + '  结果')
+        for name, result in results.items():
+            counts = [result['counts'][size] for size in sizes]
+            problems = []
+            if any(status >= 500 for status in result['status'].values()):
+                problems.append('请求失败')
+            if counts[-1] > counts[0]:
+                problems.append('随数据量增长')
+            if max(counts) > result['budget']:
+                problems.append('超出预算')
+            result['problems'] = problems
+            failures += bool(problems)
+            
+            print(f"{name:<24}{result['budget']:>6}" + ''.join(f'{count:>8}' for count in counts)
+                  + '  ' + ('❌ ' + '，'.join(problems) if problems else '✅'))
+            if problems and args.verbose:
+                for statement in statements[name]:
+                    print('    ' + ' '.join(statement.split())[:160])
+        
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({'sizes': sizes, 'results': results}, f, ensure_ascii=False, indent=2)
+        
+        print(f"\n{'✅ 全部通过' if not failures else f'❌ {failures} 个接口未通过'}")
+        return 1 if failures else 0
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
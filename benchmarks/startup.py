@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+工作进程启动基准测试
+在新的Python进程中创建应用并处理第一个请求，测量启动到完成第一个请求的时间和内存占用（RSS），
+并检查openpyxl、Pillow等较重的模块没有在启动时加载。超过目标值时返回非0退出码
+
+使用方式: python -m benchmarks.startup [--runs 5] [--target-ms 1200] [--target-rss-mb 100] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# 只在导入、导出和图片处理时需要的模块，启动时不应加载
+LAZY_MODULES = ['openpyxl', 'PIL.Image']
+
+# 在子进程中执行：创建应用并处理第一个请求，输出各阶段耗时和内存
+CHILD_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app('production')
+created = time.perf_counter()
+response = app.test_client().get('/auth/login')
+finished = time.perf_counter()
+
+rss_kb = None
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+print(json.dumps({
+    'status': response.status_code,
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (finished - created) * 1000,
+    'rss_mb': rss_kb / 1024 if rss_kb else None,
+    'loaded': [name for name in %r if name in sys.modules]
+}))
+''' % (LAZY_MODULES,)
+
+def child_env(folder):
+    """子进程使用生产环境配置和临时数据库"""
+    env = dict(os.environ)
+    env.update({
+        'FLASK_ENV': 'production',
+        'DATABASE_URL': f"sqlite:///{os.path.join(folder, 'startup.db')}",
+        'REDIS_URL': env.get('REDIS_URL', 'redis://localhost:1/0'),
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    return env
+
+def run_once(env, cwd):
+    """启动一个子进程，返回其测量结果和从启动进程到完成第一个请求的总时间"""
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT], env=env, cwd=cwd,
+        capture_output=True, text=True, check=True
+    ).stdout
+    total = (time.perf_counter() - start) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result['total_ms'] = total
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='工作进程启动基准测试')
+    parser.add_argument('--runs', type=int, default=5, help='启动次数')
+    parser.add_argument('--target-ms', type=float, default=1200, help='启动到完成第一个请求的目标时间（毫秒，中位数）')
+    parser.add_argument('--target-rss-mb', type=float, default=100, help='完成第一个请求后的内存目标（MB，中位数）')
+    parser.add_argument('--json', help='将结果写入JSON文件')
+    args = parser.parse_args()
+    
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    folder = tempfile.mkdtemp(prefix='startup_')
+    try:
+        env = child_env(folder)
+        # 先执行一次迁移，测量的启动过程与生产环境一致（不建表）
+        subprocess.run(
+            [sys.executable, 'migrate.py', '--env', 'production'], env=env, cwd=root,
+            capture_output=True, check=True
+        )
+        
+        results = [run_once(env, root) for _ in range(args.runs)]
+        summary = {
+            key: round(statistics.median(result[key] for result in results), 1)
+            for key in ('total_ms', 'import_ms', 'create_app_ms', 'first_request_ms', 'rss_mb')
+        }
+        loaded = sorted({name for result in results for name in result['loaded']})
+        
+        print(f"🚀 启动 {args.runs} 次（中位数）")
+        print(f"   启动到完成第一个请求: {summary['total_ms']}ms（目标 {args.target_ms}ms）")
+        print(f"   导入模块: {summary['import_ms']}ms, create_app: {summary['create_app_ms']}ms, "
+              f"第一个请求: {summary['first_request_ms']}ms")
+        print(f"   内存: {summary['rss_mb']}MB（目标 {args.target_rss_mb}MB）")
+        
+        problems = []
+        if summary['total_ms'] > args.target_ms:
+            problems.append('启动时间超过目标')
+        if summary['rss_mb'] and summary['rss_mb'] > args.target_rss_mb:
+            problems.append('内存超过目标')
+        if loaded:
+            problems.append(f"启动时加载了 {', '.join(loaded)}")
+        if any(result['status'] >= 500 for result in results):
+            problems.append('请求失败')
+        
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'runs': results, 'summary': summary, 'loaded': loaded,
+                    'targets': {'total_ms': args.target_ms, 'rss_mb': args.target_rss_mb},
+                    'problems': problems
+                }, f, ensure_ascii=False, indent=2)
+        
+        print(f"\n{'✅ 达到目标' if not problems else '❌ ' + '，'.join(problems)}")
+        return 1 if problems else 0
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+端到端性能基准测试
+在合成数据集上测量各API接口的延迟（p50/p95/p99）和吞吐量，以及导入、导出的处理速度。
+结果保存为JSON，可与之前的结果对比
+
+使用方式: python -m benchmarks.suite [--scale small] [--database-url postgresql://...] [--compare old.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from benchmarks.common import create_bench_app, login, run_export_job
+from benchmarks.datasets import SCALES, generate_dataset, write_import_workbook, write_import_csv
+
+# 每个接口：(名称, 方法, URL, 请求参数)，{key} 从测试数据上下文中取值
+ENDPOINTS = [
+    ('get_projects', 'GET', '/api/projects', None),
+    ('get_products', 'GET', '/api/projects/{project_id}/products', None),
+    ('get_products_cursor', 'GET', '/api/projects/{project_id}/products?cursor=', None),
+    ('get_skcs', 'GET', '/api/products/{product_id}/skcs', None),
+    ('get_skcs_cursor', 'GET', '/api/products/{product_id}/skcs?cursor=', None),
+    ('get_product_images', 'GET', '/api/products/{product_id}/images', None),
+    ('get_user_stats', 'GET', '/api/stats/user', None),
+    ('batch_update_skcs', 'PUT', '/api/skcs/batch_update',
+     lambda ctx, i: {'json': {'skc_codes': ctx['codes'], 'status': ('已下架', '核价通过')[i % 2]}}),
+    ('stream_ndjson', 'GET', '/api/projects/{project_id}/skcs.ndjson', None),
+    ('stream_csv', 'GET', '/api/projects/{project_id}/skcs.csv', None),
+]
+
+# 流式导出整个项目，耗时较长，减少请求次数
+SLOW_ENDPOINTS = {'stream_ndjson', 'stream_csv'}
+
+def percentile(values, p):
+    """最近秩法计算百分位数"""
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * p // 100) - 1)
+    return ordered[int(index)]
+
+def summarize(durations, elapsed=None):
+    """汇总延迟（毫秒）和吞吐量"""
+    elapsed = elapsed if elapsed is not None else sum(durations)
+    return {
+        'requests': len(durations),
+        'p50_ms': round(percentile(durations, 50) * 1000, 2),
+        'p95_ms': round(percentile(durations, 95) * 1000, 2),
+        'p99_ms': round(percentile(durations, 99) * 1000, 2),
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 2),
+        'rps': round(len(durations) / elapsed, 1) if elapsed else None
+    }
+
+def measure_endpoint(client, ctx, method, url, kwargs, requests, warmup):
+    """预热后重复请求接口，返回统计结果"""
+    url = url.format(**ctx)
+    durations = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(warmup + requests):
+        options = kwargs(ctx, i) if kwargs else {}
+        start = time.perf_counter()
+        response = client.open(url, method=method, **options)
+        response.get_data()  # 流式响应需要读取完毕
+        duration = time.perf_counter() - start
+        if i == warmup - 1:
+            started = time.perf_counter()
+        if i < warmup:
+            continue
+        durations.append(duration)
+        errors += response.status_code >= 400
+    result = summarize(durations, time.perf_counter() - started)
+    result['errors'] = errors
+    return result
+
+def measure_import(client, project_id, file_path, filename, rows):
+    """上传并导入文件，返回耗时和每秒行数"""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    start = time.perf_counter()
+    response = client.post(
+        f'/api/projects/{project_id}/import',
+        data={'excel': (io.BytesIO(data), filename)}
+    )
+    elapsed = time.perf_counter() - start
+    if not response.json.get('success'):
+        raise RuntimeError(f'导入失败: {response.json}')
+    return {
+        'rows': rows,
+        'bytes': len(data),
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1)
+    }
+
+def measure_export(app, client, project_id, skc_count):
+    """创建并同步执行导出任务，返回耗时和每秒SKC数"""
+    start = time.perf_counter()
+    response = client.post(f'/api/projects/{project_id}/export')
+    job_id = response.json['job']['id']
+    run_export_job(app, job_id)
+    elapsed = time.perf_counter() - start
+    
+    status = client.get(f'/api/export_jobs/{job_id}').json['job']['status']
+    if status != 'done':
+        raise RuntimeError(f'导出失败: 任务状态 {status}')
+    return {
+        'skcs': skc_count,
+        'seconds': round(elapsed, 3),
+        'skcs_per_second': round(skc_count / elapsed, 1)
+    }
+
+def git_commit():
+    """当前代码版本，无法获取时返回None"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_context(app, project_ids):
+    """选取SKC最多的项目及其第一个产品作为测试对象"""
+    from models import db, Product, SKC
+    
+    with app.app_context():
+        skc_counts = dict(db.session.execute(
+            db.select(Product.project_id, db.func.count(SKC.id))
+            .join(SKC, SKC.product_id == Product.id)
+            .where(Product.project_id.in_(project_ids))
+            .group_by(Product.project_id)
+        ).all())
+        project_id = max(project_ids, key=lambda pid: skc_counts.get(pid, 0))
+        product_id = db.session.scalar(
+            db.select(Product.id).where(Product.project_id == project_id).order_by(Product.id).limit(1)
+        )
+        codes = db.session.scalars(
+            db.select(SKC.code).where(SKC.product_id == product_id).order_by(SKC.id).limit(100)
+        ).all()
+        return {
+            'project_id': project_id,
+            'product_id': product_id,
+            'codes': codes,
+            'project_skcs': skc_counts.get(project_id, 0)
+        }
+
+def compare(results, baseline_path):
+    """与之前的结果对比p95延迟和处理速度"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    
+    def change(new, old):
+        return f'{(new - old) / old * 100:+.1f}%' if old else '-'
+    
+    print(f"\n📈 对比 {baseline_path}（{baseline['meta'].get('commit')}）")
+    for name, result in results['endpoints'].items():
+        old = baseline.get('endpoints', {}).get(name)
+        if old:
+            print(f"  {name:<24}p95 {old['p95_ms']:>9} → {result['p95_ms']:>9} ms  {change(result['p95_ms'], old['p95_ms'])}")
+    for name, result in results['imports'].items():
+        old = baseline.get('imports', {}).get(name)
+        if old:
+            print(f"  import_{name:<17}{old['rows_per_second']:>13} → {result['rows_per_second']:>9} 行/s "
+                  f"{change(result['rows_per_second'], old['rows_per_second'])}")
+    old = baseline.get('export')
+    if old:
+        new = results['export']['skcs_per_second']
+        print(f"  {'export':<24}{old['skcs_per_second']:>13} → {new:>9} SKC/s "
+              f"{change(new, old['skcs_per_second'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端性能基准测试')
+    parser.add_argument('--scale', choices=SCALES, default='small', help='数据规模')
+    parser.add_argument('--database-url', help='数据库地址（默认使用临时SQLite数据库）')
+    parser.add_argument('--requests', type=int, default=50, help='每个接口的请求次数')
+    parser.add_argument('--warmup', type=int, default=3, help='每个接口的预热请求次数')
+    parser.add_argument('--import-products', type=int, default=200, help='导入文件的产品数')
+    parser.add_argument('--import-skcs', type=int, default=50, help='导入文件每个产品的SKC数')
+    parser.add_argument('--output', help='结果文件（默认 benchmarks/results/<时间>_<数据库>.json）')
+    parser.add_argument('--compare', help='与之前的结果文件对比')
+    args = parser.parse_args()
+    
+    folder = tempfile.mkdtemp(prefix='bench_suite_')
+    # 每次运行使用不同前缀，可在已有数据的数据库上重复运行
+    prefix = f'b{uuid.uuid4().hex[:6]}'
+    try:
+        app = create_bench_app(folder, args.database_url, name='bench_suite')
+        with app.app_context():
+            from models import db
+            dialect = db.engine.dialect.name
+        scale = SCALES[args.scale]
+        
+        print(f"🧪 生成 {args.scale} 数据集（{dialect}）: {scale}")
+        dataset = generate_dataset(app, scale, prefix)
+        print(f"   用时 {dataset['seconds']}s: {dataset['rows']}")
+        
+        client = app.test_client()
+        login(client, dataset['users'][0])
+        ctx = build_context(app, dataset['projects'][:scale['projects']])
+        
+        results = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'dialect': dialect,
+                'python': platform.python_version(),
+                'scale': args.scale,
+                'dataset': dataset['rows'],
+                'seed_seconds': dataset['seconds'],
+                'requests': args.requests
+            },
+            'endpoints': {},
+            'imports': {}
+        }
+        
+        print(f"\n{'接口':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}")
+        for name, method, url, kwargs in ENDPOINTS:
+            requests = max(1, args.requests // 10) if name in SLOW_ENDPOINTS else args.requests
+            warmup = min(args.warmup, 1) if name in SLOW_ENDPOINTS else args.warmup
+            result = measure_endpoint(client, ctx, method, url, kwargs, requests, warmup)
+            results['endpoints'][name] = result
+            print(f"{name:<24}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}{result['rps']:>9}"
+                  + (f"  ⚠️ {result['errors']} 个错误" if result['errors'] else ''))
+        
+        rows = args.import_products * args.import_skcs
+        import_project = client.post('/api/projects', json={'name': f'{prefix}-导入'}).json['project']['id']
+        for name, writer, filename in (
+            ('xlsx', write_import_workbook, 'import.xlsx'),
+            ('csv', write_import_csv, 'import.csv'),
+        ):
+            file_path = os.path.join(folder, filename)
+            writer(file_path, args.import_products, args.import_skcs, f'{prefix}{name}')
+            result = measure_import(client, import_project, file_path, filename, rows)
+            results['imports'][name] = result
+            print(f"import_{name:<17}{result['seconds']:>8}s  {result['rows_per_second']:>9} 行/s")
+        
+        result = measure_export(app, client, ctx['project_id'], ctx['project_skcs'])
+        results['export'] = result
+        print(f"{'export':<24}{result['seconds']:>8}s  {result['skcs_per_second']:>9} SKC/s")
+        
+        output = args.output or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'results',
+            f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{dialect}.json"
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 结果已保存: {output}")
+        
+        if args.compare:
+            compare(results, args.compare)
+        
+        errors = sum(result['errors'] for result in results['endpoints'].values())
+        return 1 if errors else 0
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
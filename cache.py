@@ -1,6 +1,7 @@
 import redis
 import json
 import pickle
+import uuid
 from functools import wraps
 from flask import current_app
 from datetime import datetime, timedelta
@@ -176,6 +177,18 @@ def cache_user_stats(user_id):
     """缓存用户统计的键"""
     return f"user:{user_id}:stats"
 
+def cache_user_project_count(user_id):
+    """缓存用户项目总数的键"""
+    return f"user:{user_id}:project_count"
+
+def cache_project_product_count(project_id):
+    """缓存项目产品总数的键"""
+    return f"project:{project_id}:product_count"
+
+def cache_product_skc_count(product_id, status=None):
+    """缓存产品SKC总数的键"""
+    return f"product:{product_id}:skc_count:{status or 'all'}"
+
 def invalidate_user_cache(user_id):
     """清除用户相关缓存"""
     patterns = [
@@ -208,7 +221,8 @@ class RateLimiter:
             return True  # 如果没有Redis，不限制
         
         try:
-            current_time = int(datetime.utcnow().timestamp())
+            now = datetime.utcnow().timestamp()
+            current_time = int(now)
             window_start = current_time - window
             
             # 使用滑动窗口算法
@@ -220,8 +234,8 @@ class RateLimiter:
             # 获取当前窗口内的请求数
             pipe.zcard(key)
             
-            # 添加当前请求
-            pipe.zadd(key, {str(current_time): current_time})
+            # 添加当前请求（成员使用精确时间和随机后缀，同一秒内的多个请求分别计数）
+            pipe.zadd(key, {f"{now}:{uuid.uuid4().hex[:8]}": current_time})
             
             # 设置过期时间
             pipe.expire(key, window)
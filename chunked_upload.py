@@ -0,0 +1,50 @@
+import hashlib
+import os
+from flask import current_app
+
+# 每次从请求流读取的字节数
+READ_SIZE = 64 * 1024
+
+def get_upload_folder():
+    """分片上传的临时目录"""
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp', 'chunked')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def create_upload_file(upload_id, ext):
+    """创建空的上传文件，返回路径"""
+    file_path = os.path.join(get_upload_folder(), f"upload_{upload_id}.{ext}")
+    open(file_path, 'wb').close()
+    return file_path
+
+def write_chunk(file_path, stream, offset, length):
+    """将请求流中的分片写入文件的 offset 处，返回写入后的文件大小
+    
+    offset 之后的旧数据（上次中断时写入的部分分片）会被截断
+    """
+    with open(file_path, 'r+b') as f:
+        f.seek(offset)
+        f.truncate()
+        remaining = length
+        while remaining > 0:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            f.write(data)
+            remaining -= len(data)
+        return f.tell()
+
+def file_sha256(file_path):
+    """计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def remove_upload_file(file_path):
+    """删除上传文件"""
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
@@ -22,16 +22,106 @@ class Config:
     # 文件上传配置
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'xlsx', 'xlsm'}
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'xlsx', 'xlsm', 'csv', 'tsv'}
+    
+    # 分片上传配置：每个分片的大小需小于 MAX_CONTENT_LENGTH
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+    UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', 1024 * 1024 * 1024))  # 1GB
+    
+    # 多工作表Excel并行解析的进程数（1表示不使用进程池）
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', min(4, os.cpu_count() or 1)))
+    
+    # 多项目打包导出时并行生成Excel的进程数（1表示不使用进程池）
+    EXPORT_BUNDLE_WORKERS = int(os.environ.get('EXPORT_BUNDLE_WORKERS', min(4, os.cpu_count() or 1)))
+    
+    # 导出图片缩略图配置
+    EXPORT_IMAGE_SIZE = 100  # 像素
+    IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+    
+    # 后台任务配置：thread 在Web进程的线程池中执行，worker 由 worker.py 进程执行
+    JOB_RUNNER = os.environ.get('JOB_RUNNER', 'thread')
+    JOB_THREADS = int(os.environ.get('JOB_THREADS', 2))
+    JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 3600))  # 执行超过该时间的任务视为失败
+    
+    # 文件清理配置（由 worker.py 定期执行）
+    EXPORT_RETENTION_DAYS = int(os.environ.get('EXPORT_RETENTION_DAYS', 7))
+    EXPORT_QUOTA_BYTES = int(os.environ.get('EXPORT_QUOTA_BYTES', 500 * 1024 * 1024))  # 每个用户的导出文件上限
+    TEMP_RETENTION_HOURS = int(os.environ.get('TEMP_RETENTION_HOURS', 24))
+    ORPHAN_GRACE_HOURS = 1  # 没有数据库记录的文件保留时间
+    JANITOR_INTERVAL = int(os.environ.get('JANITOR_INTERVAL', 3600))  # 秒，0表示不清理；thread 模式下由Web进程执行
+    JANITOR_BATCH_SIZE = 500
+    PROJECT_PURGE_DAYS = int(os.environ.get('PROJECT_PURGE_DAYS', 30))  # 软删除的项目保留天数
+    
+    # 指标配置：/metrics 输出Prometheus格式的请求指标，设置 METRICS_TOKEN 后需要携带 Bearer 令牌访问
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # 慢查询日志：记录超过阈值的SQL语句（0表示不记录），每类语句第一次出现时记录执行计划
+    # 多个工作进程时可在路径中使用 {pid}，每个进程写入自己的文件；默认写入 instance/ 目录（不在版本库中）
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'instance', 'logs', 'slow_queries.log'
+    )
+    SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024  # 10MB
+    SLOW_QUERY_LOG_BACKUPS = 5
+    
+    # 按请求性能分析：管理员请求携带 X-Profile 请求头或 _profile 参数时分析该请求
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'true').lower() == 'true'
+    PROFILE_FOLDER = os.environ.get('PROFILE_FOLDER') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'profiles'
+    )
+    PROFILE_INTERVAL = 0.001  # 采样间隔（秒）
+    PROFILE_KEEP = 100  # 保留的分析结果数量
+    
+    # 追踪：记录请求和导出任务中SQL、Redis、openpyxl、Pillow等操作的耗时，
+    # 以OTLP JSON格式写入 TRACE_FILE，设置 TRACE_OTLP_ENDPOINT 时同时发送到收集器
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'false').lower() == 'true'
+    TRACE_SLOW_MS = int(os.environ.get('TRACE_SLOW_MS', 0))  # 只导出总耗时超过该值的追踪
+    TRACE_FILE = os.environ.get('TRACE_FILE', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'logs', 'traces.jsonl'
+    ))
+    TRACE_FILE_MAX_BYTES = 50 * 1024 * 1024  # 50MB
+    TRACE_FILE_BACKUPS = 5
+    TRACE_OTLP_ENDPOINT = os.environ.get('TRACE_OTLP_ENDPOINT')  # 例如 http://localhost:4318/v1/traces
+    TRACE_SERVICE_NAME = os.environ.get('TRACE_SERVICE_NAME', 'skc-manager')
+    TRACE_MAX_SPANS = 5000  # 每个追踪最多记录的span数
+    
+    # 启动时自动建表和升级表结构（生产环境使用 migrate.py）
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', 'false').lower() == 'true'
     
     # 会话配置
     PERMANENT_SESSION_LIFETIME = 3600  # 1小时
     
+    # 登录用户信息缓存（秒）：Redis中的缓存在用户修改后删除，
+    # 其他工作进程的进程内缓存最多在 USER_CACHE_LOCAL_TTL 后更新
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    USER_CACHE_LOCAL_TTL = int(os.environ.get('USER_CACHE_LOCAL_TTL', 10))
+    
+    # 注册页用户名/邮箱可用性检查的缓存（秒）：Redis集合的重建周期，
+    # 以及Redis不可用时进程内集合的刷新周期
+    AVAILABILITY_CACHE_TTL = int(os.environ.get('AVAILABILITY_CACHE_TTL', 3600))
+    AVAILABILITY_LOCAL_TTL = int(os.environ.get('AVAILABILITY_LOCAL_TTL', 60))
+    
+    # 反向代理层数，大于0时从 X-Forwarded-For 读取客户端IP
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    
     # 分页配置
     ITEMS_PER_PAGE = 50
+    
+    # 响应压缩配置（超过阈值的响应按Accept-Encoding使用br/gzip压缩）
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_LEVEL = 4
+    COMPRESS_MIMETYPES = {
+        'application/json', 'application/x-ndjson', 'text/csv',
+        'text/html', 'text/css', 'text/javascript', 'application/javascript'
+    }
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', 'true').lower() == 'true'
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -0,0 +1,233 @@
+import json
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from itertools import islice
+from flask import current_app
+from werkzeug.utils import secure_filename
+from models import db, Product, SKC, ProductImage, ExcelExport, skc_order_by
+from image_cache import get_export_thumbnail, evict_image_cache
+from tracing import traced, span
+
+@traced('exporter.collect_project_data')
+def collect_project_data(project):
+    """读取项目导出所需的数据
+    
+    查询次数固定（产品、主图、SKC各一次），与产品数量无关。
+    返回 [(产品名, 缩略图路径或None, [(SKC代码, 状态), ...]), ...]
+    """
+    # 获取项目的所有产品和SKC
+    products = Product.query.filter_by(project_id=project.id).all()
+    
+    primary_images = {
+        image.product_id: image
+        for image in ProductImage.query.join(Product).filter(
+            Product.project_id == project.id,
+            ProductImage.is_primary == True
+        )
+    }
+    
+    skcs_by_product = {product.id: [] for product in products}
+    rows = db.session.execute(
+        db.select(SKC.product_id, SKC.code, SKC.status)
+        .join(Product, SKC.product_id == Product.id)
+        .where(Product.project_id == project.id)
+        .order_by(SKC.product_id, *skc_order_by())
+    )
+    for product_id, code, status in rows:
+        skcs_by_product[product_id].append((code, status))
+    
+    data = []
+    for product in products:
+        primary_image = primary_images.get(product.id)
+        # 嵌入缓存的缩略图而不是原图，文件大小与显示尺寸一致
+        thumbnail_path = get_export_thumbnail(primary_image) if primary_image else None
+        data.append((product.name, thumbnail_path, skcs_by_product[product.id]))
+    return data
+
+@traced('openpyxl.render_workbook')
+def render_workbook(title, products, file_path, progress=None):
+    """根据 collect_project_data 的结果生成Excel文件（不访问数据库，可在子进程中执行）
+    
+    每两列为一个产品：第1行产品名，第2行主图，第3行表头，第4行起为SKC和状态。
+    progress(已写入产品数, 产品总数) 在每个产品写入后调用
+    """
+    # openpyxl 导入较慢，只在导出时加载
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    from openpyxl.drawing.image import Image as XLImage
+    
+    # 创建Excel文件
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    
+    total = len(products)
+    if progress:
+        progress(0, total)
+    
+    col = 1
+    for index, (product_name, thumbnail_path, skcs) in enumerate(products, start=1):
+        # 写产品名
+        ws.merge_cells(start_row=1, start_column=col, end_row=1, end_column=col+1)
+        ws.cell(row=1, column=col, value=product_name)
+        
+        # 添加图片（如果有主图）
+        if thumbnail_path:
+            try:
+                img = XLImage(thumbnail_path)
+                img.width = 100
+                img.height = 100
+                ws.add_image(img, f"{get_column_letter(col)}2")
+                ws.row_dimensions[2].height = 80
+                ws.column_dimensions[get_column_letter(col)].width = 15
+            except Exception:
+                pass
+        
+        # 写表头
+        ws.cell(row=3, column=col, value="SKC")
+        ws.cell(row=3, column=col+1, value="状态")
+        
+        # 写SKC数据
+        row = 4
+        for code, status in skcs:
+            ws.cell(row=row, column=col, value=code)
+            ws.cell(row=row, column=col+1, value=status)
+            row += 1
+        
+        col += 2
+        
+        if progress:
+            progress(index, total)
+    
+    with span('openpyxl.save'):
+        wb.save(file_path)
+    return file_path
+
+def build_project_workbook(project, file_path, progress=None):
+    """生成项目的Excel文件"""
+    render_workbook(project.name, collect_project_data(project), file_path, progress)
+    evict_image_cache()
+
+@traced('exporter.export_project')
+def export_project(project, user_id, progress=None):
+    """导出项目为Excel文件并记录导出历史，返回 ExcelExport 记录"""
+    # 同一项目可能同时有多个导出任务，加随机后缀避免写入同一文件
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    filename = f"{project.name}_{timestamp}_{uuid.uuid4().hex[:8]}.xlsx"
+    safe_filename = secure_filename(filename)
+    
+    export_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'exports')
+    os.makedirs(export_folder, exist_ok=True)
+    
+    file_path = os.path.join(export_folder, safe_filename)
+    build_project_workbook(project, file_path, progress)
+    
+    # 记录导出历史
+    file_size = os.path.getsize(file_path)
+    export_record = ExcelExport(
+        filename=safe_filename,
+        file_path=file_path,
+        project_id=project.id,
+        user_id=user_id,
+        file_size=file_size
+    )
+    
+    db.session.add(export_record)
+    db.session.commit()
+    
+    return export_record
+
+class ZipStream:
+    """只追加的输出缓冲，供 zipfile 以不可seek的流式方式写入"""
+    
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.offset
+    
+    def flush(self):
+        pass
+    
+    def pop(self):
+        """取出并清空已写入的数据"""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def bundle_arcname(project):
+    """项目在压缩包中的文件名"""
+    name = project.name.replace('/', '_').replace('\\', '_')
+    return f"{project.id}_{name}.xlsx"
+
+def submit_render(pool, project, file_path):
+    """读取项目数据并提交生成任务，没有进程池时直接在当前进程生成"""
+    future = Future()
+    try:
+        products = collect_project_data(project)
+        if pool:
+            return pool.submit(render_workbook, project.name, products, file_path)
+        future.set_result(render_workbook(project.name, products, file_path))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def iter_export_bundle(projects, max_workers=1):
+    """将多个项目导出为zip，逐块产出压缩包内容
+    
+    数据在当前进程读取，Excel在进程池中并行生成，按项目顺序写入压缩包。
+    单个项目失败不会中断导出，每个项目的结果记录在压缩包内的 manifest.json 中
+    """
+    temp_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp', f"bundle_{uuid.uuid4().hex}")
+    os.makedirs(temp_folder, exist_ok=True)
+    
+    stream = ZipStream()
+    manifest = []
+    pool = ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 and len(projects) > 1 else None
+    
+    try:
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zf:
+            # 同时最多提交 window 个项目，每完成一个就写入压缩包并产出，不等全部项目生成完
+            window = max_workers if pool else 1
+            remaining = iter(projects)
+            pending = deque()
+            while True:
+                for project in islice(remaining, window - len(pending)):
+                    pending.append((project, submit_render(pool, project, os.path.join(temp_folder, f"{project.id}.xlsx"))))
+                if not pending:
+                    break
+                
+                project, future = pending.popleft()
+                entry = {'project_id': project.id, 'name': project.name}
+                try:
+                    file_path = future.result()
+                    entry['file'] = bundle_arcname(project)
+                    zf.write(file_path, entry['file'])
+                    os.remove(file_path)
+                    entry['success'] = True
+                except Exception as e:
+                    current_app.logger.warning(f"项目 {project.id} 打包导出失败: {e}")
+                    entry['success'] = False
+                    entry['message'] = str(e)
+                manifest.append(entry)
+                yield stream.pop()
+            
+            zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+        
+        yield stream.pop()
+        evict_image_cache()
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        shutil.rmtree(temp_folder, ignore_errors=True)
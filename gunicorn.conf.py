@@ -33,6 +33,14 @@ access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"
 worker_tmp_dir = "/dev/shm"
 tmp_upload_dir = None
 
+def on_starting(server):
+    """主进程启动时清空多进程指标目录（设置 PROMETHEUS_MULTIPROC_DIR 时）"""
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for name in os.listdir(metrics_dir):
+            os.remove(os.path.join(metrics_dir, name))
+
 def when_ready(server):
     """服务器启动完成时的回调"""
     server.log.info("SKC管理系统服务器启动完成")
@@ -49,6 +57,15 @@ def post_fork(server, worker):
     """工作进程fork后的回调"""
     server.log.info("工作进程 %s 已启动", worker.pid)
 
+def child_exit(server, worker):
+    """工作进程退出后标记其指标文件，使 /metrics 不再重复统计"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        try:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(worker.pid)
+        except ImportError:
+            pass
+
 def pre_exec(server):
     """执行前的回调"""
     server.log.info("服务器即将重新执行")
@@ -0,0 +1,101 @@
+import glob
+import os
+import uuid
+from flask import current_app
+from tracing import traced
+
+def get_cache_folder():
+    """缩略图缓存目录"""
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'cache', 'export_images')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def has_alpha(img):
+    """图片是否包含透明通道"""
+    return img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+
+@traced('pillow.render_thumbnail')
+def render_thumbnail(source_path, target_prefix, size):
+    """生成缩略图：保持比例缩放并补白到 size，透明图片保存为PNG，其他保存为JPEG
+    
+    返回缩略图路径
+    """
+    from PIL import Image, ImageOps
+    
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if has_alpha(img):
+            thumb = ImageOps.pad(img.convert('RGBA'), size, color=(255, 255, 255, 0))
+            fmt, ext = 'PNG', 'png'
+        else:
+            thumb = ImageOps.pad(img.convert('RGB'), size, color=(255, 255, 255))
+            fmt, ext = 'JPEG', 'jpg'
+    
+    target_path = f"{target_prefix}.{ext}"
+    # 先写临时文件再替换，避免并发导出读到不完整的文件
+    tmp_path = f"{target_path}.{uuid.uuid4().hex[:8]}.tmp"
+    thumb.save(tmp_path, fmt, quality=85, optimize=True)
+    os.replace(tmp_path, target_path)
+    return target_path
+
+def get_export_thumbnail(image):
+    """获取图片的导出缩略图路径（按图片ID和文件修改时间缓存），失败时返回None"""
+    size = current_app.config['EXPORT_IMAGE_SIZE']
+    try:
+        mtime = os.stat(image.file_path).st_mtime_ns
+    except OSError:
+        return None
+    
+    folder = get_cache_folder()
+    prefix = f"{image.id}_{mtime}_{size}"
+    for ext in ('jpg', 'png'):
+        path = os.path.join(folder, f"{prefix}.{ext}")
+        if os.path.exists(path):
+            # 刷新修改时间，用于按最近使用淘汰
+            os.utime(path)
+            return path
+    
+    # 删除该图片旧版本的缩略图
+    for stale in glob.glob(os.path.join(folder, f"{image.id}_*")):
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+    
+    try:
+        return render_thumbnail(image.file_path, os.path.join(folder, prefix), (size, size))
+    except Exception as e:
+        # 损坏、截断或超大的图片只跳过这一张，不影响整个导出
+        current_app.logger.warning(f"图片 {image.id} 生成导出缩略图失败: {e}")
+        return None
+
+def evict_image_cache():
+    """缓存超过 IMAGE_CACHE_MAX_BYTES 时按最近使用时间删除最旧的缩略图，返回释放的字节数"""
+    max_bytes = current_app.config['IMAGE_CACHE_MAX_BYTES']
+    folder = get_cache_folder()
+    
+    entries = []
+    total = 0
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+    
+    if total <= max_bytes:
+        return 0
+    
+    # 淘汰到上限的90%，避免每次导出都触发淘汰
+    target = max_bytes * 0.9
+    reclaimed = 0
+    for _, file_size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= file_size
+        reclaimed += file_size
+    return reclaimed
@@ -0,0 +1,330 @@
+import codecs
+import csv
+import os
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat
+from models import db, Project, Product, SKC, STATUS_OPTIONS, status_sort_order
+from tracing import traced
+
+# 无效状态时使用的默认状态
+DEFAULT_STATUS = '核价通过'
+
+# 每批写入的记录数
+CHUNK_SIZE = 5000
+
+# IN查询每批的参数个数（兼容旧版SQLite的参数上限）
+IN_BATCH_SIZE = 500
+
+# 长格式（每行一条 产品,SKC,状态）的表头
+LONG_FORMAT_HEADERS = {
+    ('product', 'skc', 'status'),
+    ('产品', 'skc', '状态'),
+    ('产品名称', 'skc', '状态'),
+}
+
+CSV_EXTENSIONS = {'csv', 'tsv'}
+
+def normalize_status(status):
+    """无效状态替换为默认状态"""
+    return status if status in STATUS_OPTIONS else DEFAULT_STATUS
+
+def chunked(iterable, size):
+    """按固定大小分批"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def detect_encoding(file_path):
+    """检测CSV编码：UTF-8（含BOM）或GB18030（兼容GBK导出的文件）"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'gb18030'
+
+def detect_delimiter(file_path, first_line):
+    """根据扩展名和首行判断分隔符"""
+    if file_path.lower().endswith('.tsv'):
+        return '\t'
+    if '\t' in first_line and ',' not in first_line:
+        return '\t'
+    return ','
+
+def is_long_header(row):
+    """首行是否为长格式表头"""
+    cells = tuple(cell.strip().lower() for cell in row[:3])
+    return cells in LONG_FORMAT_HEADERS
+
+def wide_header_products(first_row):
+    """宽格式首行的产品名：{列号: 产品名}，每两列一个产品"""
+    return {
+        col: name.strip()
+        for col, name in enumerate(first_row)
+        if col % 2 == 0 and name.strip()
+    }
+
+def iter_wide_records(products, reader):
+    """解析与Excel相同的布局：第1行为产品名（每两列一个产品），第4行起为 SKC/状态"""
+    # 跳过第2行（图片）和第3行（表头）
+    for _ in range(2):
+        next(reader, None)
+    
+    for row in reader:
+        for col, product_name in products.items():
+            if col + 1 >= len(row):
+                continue
+            code = row[col].strip()
+            status = row[col + 1].strip()
+            if code and status:
+                yield product_name, code, status
+
+def iter_long_records(reader):
+    """解析长格式：每行 产品,SKC,状态"""
+    for row in reader:
+        if len(row) < 3:
+            continue
+        product_name, code, status = (cell.strip() for cell in row[:3])
+        if product_name and code and status:
+            yield product_name, code, status
+
+def read_csv_records(f, file_path, layout=None):
+    """流式解析已打开的CSV/TSV文件，返回 (产品名列表, (产品名, SKC代码, 状态) 迭代器)
+    
+    layout 为 'wide'（与Excel相同布局）或 'long'（产品,SKC,状态），为空时根据首行自动判断。
+    宽格式返回首行的所有产品名，与Excel导入一致，没有SKC的产品也会被创建
+    """
+    first_line = f.readline()
+    f.seek(0)
+    reader = csv.reader(f, delimiter=detect_delimiter(file_path, first_line))
+    
+    first_row = next(reader, None)
+    if first_row is None:
+        return [], iter(())
+    
+    if layout == 'long' or (layout is None and is_long_header(first_row)):
+        if is_long_header(first_row):
+            return [], iter_long_records(reader)
+        # 没有表头的长格式，首行也是数据
+        return [], iter_long_records(chain([first_row], reader))
+    
+    products = wide_header_products(first_row)
+    return list(products.values()), iter_wide_records(products, reader)
+
+def import_csv(project_id, file_path, layout=None, mode='insert'):
+    """流式导入CSV/TSV文件，返回 bulk_import 的计数"""
+    with open(file_path, newline='', encoding=detect_encoding(file_path)) as f:
+        product_names, records = read_csv_records(f, file_path, layout)
+        return bulk_import(project_id, records, product_names=product_names, mode=mode)
+
+def get_product_ids(project_id, names=None):
+    """获取项目下产品名到ID的映射"""
+    query = db.session.query(Product.name, Product.id).filter(Product.project_id == project_id)
+    if names is None:
+        return dict(query.all())
+    
+    product_ids = {}
+    for batch in chunked(names, IN_BATCH_SIZE):
+        product_ids.update(query.filter(Product.name.in_(batch)).all())
+    return product_ids
+
+def ensure_products(project_id, names, product_ids):
+    """批量创建缺失的产品，并更新 product_ids 映射"""
+    new_names = sorted({name for name in names if name not in product_ids})
+    if not new_names:
+        return
+    
+    now = datetime.utcnow()
+    db.session.execute(db.insert(Product), [{
+        'name': name,
+        'project_id': project_id,
+        'created_at': now,
+        'updated_at': now
+    } for name in new_names])
+    product_ids.update(get_product_ids(project_id, new_names))
+
+def find_existing_skcs(codes):
+    """批量查询已存在的SKC，返回 {代码: (状态, 所属项目ID)}"""
+    existing = {}
+    for batch in chunked(codes, IN_BATCH_SIZE):
+        existing.update(
+            (code, (status, project_id))
+            for code, status, project_id in db.session.execute(
+                db.select(SKC.code, SKC.status, Product.project_id)
+                .join(Product, SKC.product_id == Product.id)
+                .where(SKC.code.in_(batch))
+            )
+        )
+    return existing
+
+def bulk_update_statuses(changes, now, priority):
+    """按目标状态分组批量更新SKC状态和排序键（priority 为项目的状态优先级），返回受影响的产品ID集合"""
+    by_status = {}
+    for code, status in changes:
+        by_status.setdefault(status, []).append(code)
+    
+    product_ids = set()
+    for status, codes in by_status.items():
+        for batch in chunked(codes, IN_BATCH_SIZE):
+            product_ids.update(db.session.scalars(
+                db.select(SKC.product_id).where(SKC.code.in_(batch)).distinct()
+            ))
+            db.session.execute(
+                db.update(SKC)
+                .where(SKC.code.in_(batch))
+                .values(status=status, sort_order=status_sort_order(status, priority), updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+    return product_ids
+
+def touch_products(product_ids, now):
+    """批量刷新产品的更新时间"""
+    for batch in chunked(product_ids, IN_BATCH_SIZE):
+        db.session.execute(
+            db.update(Product)
+            .where(Product.id.in_(batch))
+            .values(updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+@traced('importer.bulk_import')
+def bulk_import(project_id, records, chunk_size=CHUNK_SIZE, product_names=(), mode='insert'):
+    """分批写入 (产品名, SKC代码, 状态) 记录
+    
+    mode 为 'insert' 时已存在的SKC跳过；为 'upsert' 时本项目中已存在且状态不同的SKC
+    按状态分组批量更新，其他项目中的SKC跳过。每批只执行固定数量的语句，
+    由调用方负责在同一事务中提交。product_names 中没有SKC的产品也会被创建。
+    返回 {'imported', 'updated', 'unchanged', 'skipped'} 计数
+    """
+    upsert = mode == 'upsert'
+    priority = db.session.get(Project, project_id).get_status_priority()
+    product_ids = get_product_ids(project_id)
+    ensure_products(project_id, product_names, product_ids)
+    counts = {'imported': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    touched_products = set()
+    
+    for chunk in chunked(records, chunk_size):
+        ensure_products(project_id, (name for name, _, _ in chunk), product_ids)
+        existing = find_existing_skcs({code for _, code, _ in chunk})
+        
+        now = datetime.utcnow()
+        seen = set()
+        rows = []
+        changes = []
+        for product_name, code, status in chunk:
+            if code in seen:
+                counts['skipped'] += 1
+                continue
+            seen.add(code)
+            status = normalize_status(status)
+            
+            if code in existing:
+                current_status, skc_project_id = existing[code]
+                if not upsert or skc_project_id != project_id:
+                    counts['skipped'] += 1
+                elif current_status == status:
+                    counts['unchanged'] += 1
+                else:
+                    changes.append((code, status))
+                continue
+            
+            rows.append({
+                'code': code,
+                'status': status,
+                'product_id': product_ids[product_name],
+                'sort_order': status_sort_order(status, priority),
+                'created_at': now,
+                'updated_at': now
+            })
+            touched_products.add(product_ids[product_name])
+        
+        if rows:
+            db.session.execute(db.insert(SKC), rows)
+            counts['imported'] += len(rows)
+        
+        if changes:
+            touched_products |= bulk_update_statuses(changes, now, priority)
+            counts['updated'] += len(changes)
+    
+    touch_products(touched_products, datetime.utcnow())
+    
+    return counts
+
+@traced('openpyxl.parse_worksheet')
+def parse_worksheet(file_path, sheet_index):
+    """解析单个工作表（在子进程中执行）
+    
+    第1行为产品名（每两列一个产品），第4行起为 SKC/状态。
+    返回 (产品名列表, [(产品名, SKC代码, 状态), ...])
+    """
+    from openpyxl import load_workbook
+    
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[sheet_index].iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        products = {
+            col: str(value).strip()
+            for col, value in enumerate(header)
+            if col % 2 == 0 and value
+        }
+        
+        # 跳过第2行（图片）和第3行（表头）
+        for _ in range(2):
+            next(rows, None)
+        
+        records = []
+        for row in rows:
+            for col, product_name in products.items():
+                if col + 1 >= len(row):
+                    continue
+                code = row[col]
+                status = row[col + 1]
+                if code and status:
+                    records.append((product_name, str(code).strip(), str(status).strip()))
+        
+        return list(products.values()), records
+    finally:
+        wb.close()
+
+@traced('openpyxl.parse_workbook')
+def parse_workbook(file_path, max_workers=1):
+    """解析工作簿的所有工作表，多个工作表时在进程池中并行解析
+    
+    返回 (产品名列表, [(产品名, SKC代码, 状态), ...])，按工作表顺序合并
+    """
+    # openpyxl 导入较慢，只在导入Excel时加载
+    from openpyxl import load_workbook
+    
+    wb = load_workbook(file_path, read_only=True)
+    sheet_count = len(wb.sheetnames)
+    wb.close()
+    
+    if sheet_count <= 1 or max_workers <= 1:
+        results = [parse_worksheet(file_path, index) for index in range(sheet_count)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, sheet_count)) as pool:
+            results = list(pool.map(parse_worksheet, repeat(file_path), range(sheet_count)))
+    
+    product_names = []
+    records = []
+    for names, sheet_records in results:
+        product_names.extend(names)
+        records.extend(sheet_records)
+    return product_names, records
+
+def import_workbook(project_id, file_path, max_workers=1, mode='insert'):
+    """导入Excel工作簿，返回 bulk_import 的计数"""
+    product_names, records = parse_workbook(file_path, max_workers)
+    return bulk_import(project_id, records, product_names=product_names, mode=mode)
+
+def is_csv_file(file_path):
+    """是否为CSV/TSV文件"""
+    return os.path.splitext(file_path)[1].lstrip('.').lower() in CSV_EXTENSIONS
@@ -0,0 +1,338 @@
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, Project, Product, SKC, ProductImage, ExcelExport, ExportJob, UploadSession
+from image_cache import evict_image_cache
+
+def remove_file(file_path):
+    """删除文件，返回释放的字节数（文件不存在时为0）"""
+    try:
+        size = os.path.getsize(file_path)
+        os.remove(file_path)
+        return size
+    except OSError:
+        return 0
+
+def delete_exports(query, batch_size):
+    """分批删除查询到的导出记录及其文件，返回 (删除数量, 释放字节数)
+    
+    每批单独提交，避免长时间持有锁
+    """
+    deleted = 0
+    reclaimed = 0
+    while True:
+        exports = query.limit(batch_size).all()
+        if not exports:
+            break
+        
+        export_ids = [export.id for export in exports]
+        for export in exports:
+            reclaimed += remove_file(export.file_path)
+        
+        # 导出任务只保留状态，解除对导出记录的引用
+        db.session.execute(
+            db.update(ExportJob)
+            .where(ExportJob.export_id.in_(export_ids))
+            .values(export_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            db.delete(ExcelExport)
+            .where(ExcelExport.id.in_(export_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        db.session.expire_all()
+        deleted += len(export_ids)
+        
+        if len(export_ids) < batch_size:
+            break
+    return deleted, reclaimed
+
+def purge_expired_exports(batch_size):
+    """删除超过保留期的导出文件，以及已删除项目的导出文件"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['EXPORT_RETENTION_DAYS'])
+    inactive_projects = db.select(Project.id).where(Project.is_active == False)
+    query = ExcelExport.query.filter(
+        db.or_(
+            ExcelExport.created_at < cutoff,
+            ExcelExport.project_id.in_(inactive_projects)
+        )
+    ).order_by(ExcelExport.id)
+    return delete_exports(query, batch_size)
+
+def enforce_export_quotas(batch_size):
+    """每个用户的导出文件超过配额时，从最早的导出开始删除"""
+    quota = current_app.config['EXPORT_QUOTA_BYTES']
+    over_quota = db.session.execute(
+        db.select(ExcelExport.user_id)
+        .group_by(ExcelExport.user_id)
+        .having(db.func.sum(ExcelExport.file_size) > quota)
+    ).scalars().all()
+    
+    deleted = 0
+    reclaimed = 0
+    for user_id in over_quota:
+        # 从最新的导出开始累计，超出配额的部分全部删除（始终保留最新的一个）
+        total = 0
+        keep_before = None
+        for index, (export_id, file_size) in enumerate(db.session.execute(
+            db.select(ExcelExport.id, ExcelExport.file_size)
+            .where(ExcelExport.user_id == user_id)
+            .order_by(ExcelExport.created_at.desc(), ExcelExport.id.desc())
+        )):
+            total += file_size or 0
+            if total > quota and index > 0:
+                keep_before = export_id
+                break
+        
+        if keep_before is None:
+            continue
+        
+        boundary = db.session.get(ExcelExport, keep_before)
+        query = ExcelExport.query.filter(
+            ExcelExport.user_id == user_id,
+            db.or_(
+                ExcelExport.created_at < boundary.created_at,
+                db.and_(ExcelExport.created_at == boundary.created_at, ExcelExport.id <= boundary.id)
+            )
+        ).order_by(ExcelExport.id)
+        count, size = delete_exports(query, batch_size)
+        deleted += count
+        reclaimed += size
+    return deleted, reclaimed
+
+def purge_stale_uploads(batch_size):
+    """删除长时间没有更新的分片上传会话及其文件"""
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config['TEMP_RETENTION_HOURS'])
+    deleted = 0
+    reclaimed = 0
+    while True:
+        uploads = UploadSession.query.filter(
+            UploadSession.updated_at < cutoff
+        ).limit(batch_size).all()
+        if not uploads:
+            break
+        
+        for upload in uploads:
+            reclaimed += remove_file(upload.file_path)
+        db.session.execute(
+            db.delete(UploadSession)
+            .where(UploadSession.id.in_([upload.id for upload in uploads]))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        db.session.expire_all()
+        deleted += len(uploads)
+        
+        if len(uploads) < batch_size:
+            break
+    return deleted, reclaimed
+
+def sweep_temp_folder():
+    """删除临时目录中超过保留期的文件和目录（导入失败、打包导出中断等遗留）"""
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp')
+    cutoff = time.time() - current_app.config['TEMP_RETENTION_HOURS'] * 3600
+    active_uploads = {
+        os.path.abspath(path) for path in db.session.scalars(db.select(UploadSession.file_path))
+    }
+    
+    deleted = 0
+    reclaimed = 0
+    for root, dirs, files in os.walk(folder, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_mtime < cutoff and os.path.abspath(path) not in active_uploads:
+                reclaimed += remove_file(path)
+                deleted += 1
+        
+        # 删除已清空的过期子目录
+        if root != folder and not os.listdir(root):
+            try:
+                if os.stat(root).st_mtime < cutoff:
+                    shutil.rmtree(root, ignore_errors=True)
+            except OSError:
+                pass
+    return deleted, reclaimed
+
+def sweep_orphan_files(folder, referenced):
+    """删除目录中没有数据库记录引用的文件
+    
+    只处理超过 ORPHAN_GRACE_HOURS 的文件，避免误删正在写入数据库的新文件
+    """
+    cutoff = time.time() - current_app.config['ORPHAN_GRACE_HOURS'] * 3600
+    deleted = 0
+    reclaimed = 0
+    if not os.path.isdir(folder):
+        return deleted, reclaimed
+    
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.is_file() or entry.name in referenced:
+                continue
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+            except OSError:
+                continue
+            reclaimed += remove_file(entry.path)
+            deleted += 1
+    return deleted, reclaimed
+
+def sweep_orphan_images():
+    """删除没有图片记录的图片文件"""
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'images')
+    referenced = set(db.session.scalars(
+        db.select(ProductImage.filename), execution_options={'yield_per': 5000}
+    ))
+    return sweep_orphan_files(folder, referenced)
+
+def sweep_orphan_exports():
+    """删除没有导出记录的导出文件"""
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'exports')
+    referenced = {
+        os.path.basename(path)
+        for path in db.session.scalars(
+            db.select(ExcelExport.file_path), execution_options={'yield_per': 5000}
+        )
+    }
+    return sweep_orphan_files(folder, referenced)
+
+def delete_in_batches(model, id_query, batch_size, before_delete=None):
+    """按ID分批删除，每批单独提交，返回删除的行数
+    
+    before_delete(本批ID列表) 在删除前调用（例如删除对应的文件）
+    """
+    deleted = 0
+    while True:
+        ids = db.session.scalars(id_query.limit(batch_size)).all()
+        if not ids:
+            break
+        
+        if before_delete:
+            before_delete(ids)
+        db.session.execute(
+            db.delete(model)
+            .where(model.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        deleted += len(ids)
+        
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+def purge_project(project_id, batch_size):
+    """分批彻底删除项目：SKC、图片及文件、导出记录、产品，最后删除项目本身
+    
+    返回释放的字节数
+    """
+    product_ids = db.select(Product.id).where(Product.project_id == project_id)
+    reclaimed = [0]
+    
+    def remove_files(paths):
+        for path in paths:
+            reclaimed[0] += remove_file(path)
+    
+    def remove_image_files(ids):
+        # 复制的项目共用图片文件，只删除不再被其他图片记录引用的文件
+        paths = set(db.session.scalars(
+            db.select(ProductImage.file_path).where(ProductImage.id.in_(ids))
+        ))
+        shared = set(db.session.scalars(
+            db.select(ProductImage.file_path).where(
+                ProductImage.file_path.in_(paths),
+                ProductImage.id.notin_(ids)
+            )
+        ))
+        remove_files(paths - shared)
+    
+    delete_in_batches(
+        SKC, db.select(SKC.id).where(SKC.product_id.in_(product_ids)), batch_size
+    )
+    delete_in_batches(
+        ProductImage,
+        db.select(ProductImage.id).where(ProductImage.product_id.in_(product_ids)),
+        batch_size,
+        remove_image_files
+    )
+    
+    _, size = delete_exports(
+        ExcelExport.query.filter_by(project_id=project_id).order_by(ExcelExport.id), batch_size
+    )
+    reclaimed[0] += size
+    delete_in_batches(
+        ExportJob, db.select(ExportJob.id).where(ExportJob.project_id == project_id), batch_size
+    )
+    delete_in_batches(
+        UploadSession,
+        db.select(UploadSession.id).where(UploadSession.project_id == project_id),
+        batch_size,
+        lambda ids: remove_files(db.session.scalars(
+            db.select(UploadSession.file_path).where(UploadSession.id.in_(ids))
+        ))
+    )
+    
+    delete_in_batches(Product, product_ids, batch_size)
+    db.session.execute(
+        db.delete(Project)
+        .where(Project.id == project_id, Project.is_active == False)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return reclaimed[0]
+
+def purge_deleted_projects(batch_size):
+    """彻底删除软删除超过 PROJECT_PURGE_DAYS 的项目"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['PROJECT_PURGE_DAYS'])
+    project_ids = db.session.scalars(
+        db.select(Project.id)
+        .where(
+            Project.is_active == False,
+            db.func.coalesce(Project.deleted_at, Project.updated_at) < cutoff
+        )
+        .order_by(Project.id)
+    ).all()
+    
+    reclaimed = 0
+    for project_id in project_ids:
+        reclaimed += purge_project(project_id, batch_size)
+        db.session.expire_all()
+    return len(project_ids), reclaimed
+
+def run_janitor():
+    """执行一次清理，返回每项清理的 {'count', 'bytes'} 以及合计释放的字节数"""
+    batch_size = current_app.config['JANITOR_BATCH_SIZE']
+    tasks = [
+        ('deleted_projects', lambda: purge_deleted_projects(batch_size)),
+        ('expired_exports', lambda: purge_expired_exports(batch_size)),
+        ('quota_exports', lambda: enforce_export_quotas(batch_size)),
+        ('stale_uploads', lambda: purge_stale_uploads(batch_size)),
+        ('temp_files', sweep_temp_folder),
+        ('orphan_images', sweep_orphan_images),
+        ('orphan_exports', sweep_orphan_exports),
+        ('image_cache', lambda: (None, evict_image_cache())),
+    ]
+    
+    report = {}
+    total = 0
+    for name, task in tasks:
+        try:
+            count, reclaimed = task()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception(f"清理任务 {name} 失败")
+            continue
+        report[name] = {'count': count, 'bytes': reclaimed}
+        total += reclaimed
+    
+    report['reclaimed_bytes'] = total
+    current_app.logger.info(f"清理完成，释放 {total / 1024 / 1024:.1f}MB: {report}")
+    return report
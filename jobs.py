@@ -0,0 +1,233 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, Project, ExportJob
+from exporter import export_project
+from janitor import run_janitor
+from cache import cache
+from tracing import start_trace
+
+# 进度写入数据库的最小间隔（秒）
+PROGRESS_INTERVAL = 1.0
+
+# thread 模式下检查超时任务的最小间隔（秒）
+STALE_CHECK_INTERVAL = 60
+_last_stale_check = 0.0
+
+# thread 模式下本进程下次执行文件清理的时间
+_next_janitor = 0.0
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor(app):
+    """获取进程内的后台任务线程池（延迟创建，兼容gunicorn预加载后fork）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config['JOB_THREADS'],
+                thread_name_prefix='export-job'
+            )
+    return _executor
+
+def serialize_job(job):
+    """导出任务的JSON表示"""
+    data = {
+        'id': job.id,
+        'project_id': job.project_id,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'message': job.message,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'export': None
+    }
+    if job.export:
+        data['export'] = {
+            'id': job.export.id,
+            'filename': job.export.filename,
+            'created_at': job.export.created_at,
+            'file_size': job.export.file_size
+        }
+    return data
+
+def enqueue_export_job(job_id):
+    """提交导出任务：thread 模式在本进程线程池中执行，worker 模式由 worker.py 领取"""
+    app = current_app._get_current_object()
+    if app.config['JOB_RUNNER'] == 'thread':
+        get_executor(app).submit(run_job_in_app, app, job_id)
+
+def run_job_in_app(app, job_id):
+    """在应用上下文中领取并执行任务"""
+    with app.app_context():
+        try:
+            if claim_job(job_id):
+                run_export_job(job_id)
+        finally:
+            db.session.remove()
+
+def claim_job(job_id):
+    """将待处理任务标记为执行中，返回是否领取成功（避免重复执行）"""
+    result = db.session.execute(
+        db.update(ExportJob)
+        .where(ExportJob.id == job_id, ExportJob.status == 'pending')
+        .values(status='running', started_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def claim_next_job():
+    """领取最早的待处理任务，没有任务时返回None"""
+    while True:
+        job_id = db.session.scalar(
+            db.select(ExportJob.id)
+            .where(ExportJob.status == 'pending')
+            .order_by(ExportJob.id)
+            .limit(1)
+        )
+        if job_id is None or claim_job(job_id):
+            return job_id
+
+def update_job(job_id, **values):
+    """使用独立连接更新任务状态，不影响导出使用的会话"""
+    with db.engine.begin() as conn:
+        conn.execute(
+            db.update(ExportJob).where(ExportJob.id == job_id).values(**values)
+        )
+
+def run_export_job(job_id):
+    """执行导出任务（追踪沿用创建任务的请求ID）"""
+    job = db.session.get(ExportJob, job_id)
+    with start_trace('export_job', job.trace_id, **{'job.id': job_id, 'project.id': job.project_id}):
+        execute_export_job(job)
+
+def execute_export_job(job):
+    """生成导出文件并更新任务状态"""
+    job_id = job.id
+    project = Project.query.filter_by(
+        id=job.project_id,
+        user_id=job.user_id,
+        is_active=True
+    ).first()
+    
+    if not project:
+        update_job(job_id, status='failed', message='项目不存在', finished_at=datetime.utcnow())
+        return
+    
+    last_report = [0.0]
+    
+    def progress(done, total):
+        now = time.monotonic()
+        if done == total or now - last_report[0] >= PROGRESS_INTERVAL:
+            update_job(job_id, progress=done, total=total)
+            last_report[0] = now
+    
+    try:
+        export_record = export_project(project, job.user_id, progress)
+        update_job(
+            job_id,
+            status='done',
+            export_id=export_record.id,
+            message='Excel导出成功',
+            finished_at=datetime.utcnow()
+        )
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception(f"导出任务 {job_id} 失败")
+        update_job(job_id, status='failed', message=f'导出失败: {str(e)}'[:500], finished_at=datetime.utcnow())
+
+def fail_stale_jobs(include_pending=False):
+    """将超时仍在执行中的任务标记为失败（进程退出导致的遗留任务）
+    
+    include_pending 时同时处理超时仍未开始的任务（thread 模式下任务只在创建它的进程中执行）
+    """
+    deadline = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_TIMEOUT'])
+    stale = db.and_(ExportJob.status == 'running', ExportJob.started_at < deadline)
+    if include_pending:
+        stale = db.or_(stale, db.and_(ExportJob.status == 'pending', ExportJob.created_at < deadline))
+    db.session.execute(
+        db.update(ExportJob)
+        .where(stale)
+        .values(status='failed', message='任务超时', finished_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+def check_stale_jobs():
+    """thread 模式下在创建和查询任务时处理遗留任务（gunicorn重启工作进程会中断其中的任务），
+    每个进程每 STALE_CHECK_INTERVAL 秒最多检查一次；worker 模式由 run_worker 处理
+    """
+    global _last_stale_check
+    if current_app.config['JOB_RUNNER'] != 'thread':
+        return
+    now = time.monotonic()
+    if now - _last_stale_check < STALE_CHECK_INTERVAL:
+        return
+    _last_stale_check = now
+    fail_stale_jobs(include_pending=True)
+
+def claim_janitor_run(interval):
+    """多个Web进程中只有一个执行本轮清理：Redis可用时用 SET NX 抢占，不可用时各进程分别执行"""
+    if not cache.redis_client:
+        return True
+    try:
+        return bool(cache.redis_client.set(cache._get_key('janitor:claim'), 1, nx=True, ex=interval))
+    except Exception as e:
+        current_app.logger.error(f"清理任务抢占失败: {e}")
+        return True
+
+def run_janitor_in_app(app):
+    """在应用上下文中执行一次文件清理"""
+    with app.app_context():
+        try:
+            run_janitor()
+        finally:
+            db.session.remove()
+
+def schedule_janitor():
+    """thread 模式下每 JANITOR_INTERVAL 秒在后台线程池中执行一次文件清理（由请求触发）；
+    worker 模式由 run_worker 处理
+    """
+    global _next_janitor
+    app = current_app._get_current_object()
+    interval = app.config['JANITOR_INTERVAL']
+    if app.config['JOB_RUNNER'] != 'thread' or not interval:
+        return
+    now = time.monotonic()
+    if now < _next_janitor:
+        return
+    _next_janitor = now + interval
+    if claim_janitor_run(interval):
+        get_executor(app).submit(run_janitor_in_app, app)
+
+def init_jobs(app):
+    """注册请求钩子，thread 模式下没有 worker.py 进程时也会定期清理过期文件和软删除的项目"""
+    app.before_request(schedule_janitor)
+
+def run_worker(poll_interval=2.0):
+    """后台任务进程主循环"""
+    current_app.logger.info("后台任务进程已启动")
+    fail_stale_jobs()
+    janitor_interval = current_app.config['JANITOR_INTERVAL']
+    next_janitor = time.monotonic()
+    while True:
+        # 定期清理过期的导出文件和临时文件（JANITOR_INTERVAL 为0时不清理）
+        if janitor_interval and time.monotonic() >= next_janitor:
+            run_janitor()
+            db.session.remove()
+            next_janitor = time.monotonic() + janitor_interval
+        
+        job_id = claim_next_job()
+        if job_id is None:
+            db.session.remove()
+            time.sleep(poll_interval)
+            continue
+        
+        current_app.logger.info(f"开始执行导出任务 {job_id}")
+        run_export_job(job_id)
+        db.session.remove()
@@ -0,0 +1,161 @@
+import os
+import time
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+try:
+    import prometheus_client
+    from prometheus_client import Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+    from prometheus_client import multiprocess
+except ImportError:  # prometheus_client 为可选依赖，缺失时不记录指标
+    prometheus_client = None
+
+# 每次请求的SQL语句数、Redis调用数的分桶
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# 响应大小的分桶（字节）
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+if prometheus_client:
+    REQUEST_LATENCY = Histogram(
+        'skc_http_request_duration_seconds', '请求处理时间',
+        ['endpoint', 'method', 'status']
+    )
+    RESPONSE_SIZE = Histogram(
+        'skc_http_response_size_bytes', '响应大小',
+        ['endpoint'], buckets=SIZE_BUCKETS
+    )
+    SQL_QUERIES = Histogram(
+        'skc_http_request_sql_queries', '每次请求执行的SQL语句数',
+        ['endpoint'], buckets=COUNT_BUCKETS
+    )
+    SQL_DURATION = Histogram(
+        'skc_http_request_sql_duration_seconds', '每次请求的SQL执行时间',
+        ['endpoint']
+    )
+    REDIS_CALLS = Histogram(
+        'skc_http_request_redis_calls', '每次请求的Redis调用数',
+        ['endpoint'], buckets=COUNT_BUCKETS
+    )
+    REDIS_DURATION = Histogram(
+        'skc_http_request_redis_duration_seconds', '每次请求的Redis调用时间',
+        ['endpoint']
+    )
+
+def get_request_stats():
+    """当前请求的SQL/Redis统计，不在请求中（后台任务等）时返回None"""
+    if not has_request_context():
+        return None
+    return g.get('request_stats')
+
+def record(kind, elapsed):
+    """累加当前请求的调用次数和耗时"""
+    stats = get_request_stats()
+    if stats is not None:
+        stats[f'{kind}_count'] += 1
+        stats[f'{kind}_time'] += elapsed
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record('sql', time.perf_counter() - conn.info['query_start'].pop())
+
+def handle_error(context):
+    """语句出错时不会调用 after_cursor_execute，在这里取出开始时间并计入统计"""
+    starts = context.connection.info.get('query_start') if context.connection is not None else None
+    if starts:
+        record('sql', time.perf_counter() - starts.pop())
+
+def instrument_engine(engine):
+    """为数据库引擎注册SQL计数和计时"""
+    if not event.contains(engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(engine, 'handle_error', handle_error)
+
+def timed(func, kind):
+    """包装函数，记录调用次数和耗时"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(kind, time.perf_counter() - start)
+    return wrapper
+
+def instrument_redis(client):
+    """为Redis客户端注册调用计数和计时（管道按一次调用计算）"""
+    if client is None or getattr(client, '_metrics_instrumented', False):
+        return
+    client.execute_command = timed(client.execute_command, 'redis')
+    create_pipeline = client.pipeline
+    
+    def pipeline(*args, **kwargs):
+        pipe = create_pipeline(*args, **kwargs)
+        pipe.execute = timed(pipe.execute, 'redis')
+        return pipe
+    
+    client.pipeline = pipeline
+    client._metrics_instrumented = True
+
+def start_request():
+    g.request_stats = {
+        'start': time.perf_counter(),
+        'sql_count': 0,
+        'sql_time': 0.0,
+        'redis_count': 0,
+        'redis_time': 0.0
+    }
+
+def observe_response(response):
+    """记录请求的指标"""
+    stats = g.pop('request_stats', None)
+    if stats is None or request.endpoint == 'metrics':
+        return response
+    
+    # 未匹配路由的请求统一记录，避免标签数量无限增长
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_LATENCY.labels(endpoint, request.method, str(response.status_code)).observe(
+        time.perf_counter() - stats['start']
+    )
+    SQL_QUERIES.labels(endpoint).observe(stats['sql_count'])
+    SQL_DURATION.labels(endpoint).observe(stats['sql_time'])
+    REDIS_CALLS.labels(endpoint).observe(stats['redis_count'])
+    REDIS_DURATION.labels(endpoint).observe(stats['redis_time'])
+    
+    # 流式响应的大小未知，不记录
+    size = response.calculate_content_length()
+    if size is not None:
+        RESPONSE_SIZE.labels(endpoint).observe(size)
+    return response
+
+def metrics_view(app):
+    """输出Prometheus格式的指标"""
+    token = app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return app.response_class('Unauthorized', status=401)
+    
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # gunicorn多进程：汇总所有工作进程写入共享目录的指标
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return app.response_class(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+def init_metrics(app, db, cache):
+    """注册请求指标和 /metrics 接口
+    
+    需要在 init_responses 之前调用，使响应大小按压缩后的大小记录
+    """
+    if not prometheus_client or not app.config.get('METRICS_ENABLED', True):
+        return
+    
+    with app.app_context():
+        instrument_engine(db.engine)
+    instrument_redis(cache.redis_client)
+    
+    app.before_request(start_request)
+    app.after_request(observe_response)
+    app.add_url_rule('/metrics', 'metrics', lambda: metrics_view(app))
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+SKC管理系统数据库迁移
+创建数据表、补充新增的列和索引并创建上传目录，部署时（启动Web和后台任务进程之前）执行一次
+"""
+
+import os
+import argparse
+from app import create_app
+from models import init_database
+
+def main():
+    parser = argparse.ArgumentParser(description='SKC管理系统数据库迁移')
+    parser.add_argument('--env', choices=['development', 'production'],
+                       default=os.environ.get('FLASK_ENV', 'production'), help='运行环境')
+    parser.add_argument('--create-admin', action='store_true', help='创建默认管理员 admin / admin123')
+    
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    with app.app_context():
+        created = init_database(create_admin=args.create_admin)
+    
+    upload_folder = app.config['UPLOAD_FOLDER']
+    for subfolder in ['images', 'exports', 'temp', os.path.join('cache', 'export_images')]:
+        os.makedirs(os.path.join(upload_folder, subfolder), exist_ok=True)
+    
+    print(f"✅ 数据库迁移完成，运行环境: {args.env}")
+    if created:
+        print("创建默认管理员用户: admin / admin123")
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+import json
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
@@ -43,6 +44,9 @@ class Project(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    deleted_at = db.Column(db.DateTime)  # 软删除时间，超过保留期后由清理任务彻底删除
+    # 自动整理使用的状态优先级（JSON列表），为空时使用 AUTO_SORT_PRIORITY
+    status_priority = db.Column(db.Text)
     
     # 关联关系
     products = db.relationship('Product', backref='project', lazy='dynamic', cascade='all, delete-orphan')
@@ -53,6 +57,10 @@ class Project(db.Model):
         db.Index('idx_user_project', 'user_id', 'is_active'),
     )
     
+    def get_status_priority(self):
+        """项目的状态优先级（SKC的排序依据）"""
+        return parse_status_priority(self.status_priority)
+    
     def __repr__(self):
         return f'<Project {self.name}>'
 
@@ -87,6 +95,8 @@ class SKC(db.Model):
     code = db.Column(db.String(100), nullable=False, index=True)
     status = db.Column(db.String(50), nullable=False, default='核价通过')
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    # 排序键：状态在项目状态优先级中的位置，写入和修改状态时按 status_sort_order 计算
+    sort_order = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -95,6 +105,7 @@ class SKC(db.Model):
         db.UniqueConstraint('code', name='uq_skc_code'),
         db.Index('idx_product_skc', 'product_id', 'status'),
         db.Index('idx_skc_code_status', 'code', 'status'),
+        db.Index('idx_product_sort', 'product_id', 'sort_order', 'code'),
     )
     
     def __repr__(self):
@@ -116,6 +127,7 @@ class ProductImage(db.Model):
     
     __table_args__ = (
         db.Index('idx_product_image', 'product_id', 'is_primary'),
+        db.Index('idx_image_file_path', 'file_path'),
     )
     
     def __repr__(self):
@@ -145,8 +157,160 @@ class ExcelExport(db.Model):
     def __repr__(self):
         return f'<ExcelExport {self.filename}>'
 
+class ExportJob(db.Model):
+    """导出任务表"""
+    __tablename__ = 'export_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    # pending / running / done / failed
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    progress = db.Column(db.Integer, nullable=False, default=0)  # 已写入的产品数
+    total = db.Column(db.Integer, nullable=False, default=0)  # 产品总数
+    message = db.Column(db.String(500))
+    export_id = db.Column(db.Integer, db.ForeignKey('excel_exports.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    trace_id = db.Column(db.String(32))  # 创建任务的请求ID，任务的追踪沿用该ID
+    
+    # 关联关系
+    export = db.relationship('ExcelExport')
+    
+    __table_args__ = (
+        db.Index('idx_export_job_status', 'status', 'id'),
+        db.Index('idx_user_export_job', 'user_id', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f'<ExportJob {self.id} {self.status}>'
+
+class UploadSession(db.Model):
+    """分片上传会话表"""
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    file_path = db.Column(db.String(500), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)  # 已接收的字节数
+    checksum = db.Column(db.String(64))  # 客户端提供的SHA-256（可选）
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_upload_session_updated', 'updated_at'),
+    )
+    
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.received}/{self.total_size}>'
+
 # 状态选项常量
 STATUS_OPTIONS = [
     "核价通过", "拉过库存", "已下架", "价格待定", 
     "减少库存为0", "改过体积", "价格错误"
-]
\ No newline at end of file
+]
+
+# 自动整理的默认状态优先级
+AUTO_SORT_PRIORITY = [
+    "核价通过", "拉过库存", "价格待定", "改过体积",
+    "价格错误", "减少库存为0", "已下架"
+]
+
+def parse_status_priority(value):
+    """解析项目保存的状态优先级（JSON列表），为空或无效时使用 AUTO_SORT_PRIORITY"""
+    if value:
+        try:
+            priority = json.loads(value)
+            if isinstance(priority, list):
+                return priority
+        except ValueError:
+            pass
+    return AUTO_SORT_PRIORITY
+
+def status_sort_order(status, priority):
+    """状态对应的排序键（与 status_order_case 一致）"""
+    return priority.index(status) if status in priority else len(priority)
+
+def status_order_case(priority):
+    """按状态优先级生成排序键表达式"""
+    return db.case(
+        *[(SKC.status == status, idx) for idx, status in enumerate(priority)],
+        else_=len(priority)
+    )
+
+def skc_order_by():
+    """SKC排序规则：按排序键、再按代码（使用 idx_product_sort 索引）"""
+    return (SKC.sort_order, SKC.code)
+
+# 已有数据库需要补充的列（create_all 不会修改已存在的表）
+SCHEMA_UPGRADES = [
+    ('projects', 'status_priority', 'TEXT'),
+    ('skcs', 'sort_order', 'INTEGER'),
+    ('projects', 'deleted_at', 'TIMESTAMP'),
+    ('export_jobs', 'trace_id', 'VARCHAR(32)'),
+]
+
+def backfill_sort_order(conn):
+    """按所属项目的状态优先级补充旧数据中为空的SKC排序键"""
+    if conn.execute(db.select(SKC.id).where(SKC.sort_order.is_(None)).limit(1)).first() is None:
+        return
+    
+    projects_by_priority = {}
+    for project_id, status_priority in conn.execute(db.select(Project.id, Project.status_priority)):
+        priority = tuple(parse_status_priority(status_priority))
+        projects_by_priority.setdefault(priority, []).append(project_id)
+    
+    for priority, project_ids in projects_by_priority.items():
+        for i in range(0, len(project_ids), 500):
+            conn.execute(
+                db.update(SKC)
+                .where(
+                    SKC.sort_order.is_(None),
+                    SKC.product_id.in_(
+                        db.select(Product.id).where(Product.project_id.in_(project_ids[i:i + 500]))
+                    )
+                )
+                .values(sort_order=status_order_case(list(priority)))
+            )
+
+def upgrade_schema():
+    """为旧数据库补充新增的列和索引"""
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table, column, column_type in SCHEMA_UPGRADES:
+            columns = {c['name'] for c in inspector.get_columns(table)}
+            if column not in columns:
+                conn.execute(db.text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}'))
+        
+        backfill_sort_order(conn)
+        # SQLite不支持修改已有列的约束，新建的数据库由 create_all 创建为 NOT NULL
+        if conn.dialect.name == 'postgresql':
+            conn.execute(db.text('ALTER TABLE skcs ALTER COLUMN sort_order SET NOT NULL'))
+    
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def init_database(create_admin=False):
+    """创建数据表并升级旧数据库；create_admin 时创建默认管理员 admin / admin123
+    
+    返回是否创建了管理员
+    """
+    db.create_all()
+    upgrade_schema()
+    
+    if not create_admin or User.query.filter_by(username='admin').first():
+        return False
+    admin = User(
+        username='admin',
+        email='admin@example.com',
+        is_admin=True
+    )
+    admin.set_password('admin123')
+    db.session.add(admin)
+    db.session.commit()
+    return True
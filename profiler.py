@@ -0,0 +1,282 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+from flask import Blueprint, g, request, jsonify, current_app, send_file
+from flask_login import login_required, current_user
+
+profiler_bp = Blueprint('profiler', __name__, url_prefix='/api/admin/profiles')
+
+# 触发分析的请求头和查询参数，取值 sample（采样，默认）或 cprofile（确定性）
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ARG = '_profile'
+PROFILE_MODES = {'1': 'sample', 'true': 'sample', 'sample': 'sample', 'cprofile': 'cprofile'}
+
+# 返回的热点函数数量
+TOP_FUNCTIONS = 30
+
+PROFILE_ID = re.compile(r'^[0-9]{8}_[0-9]{6}_[0-9a-f]{8}$')
+
+def frame_name(frame):
+    """栈帧名称：函数名 (文件名:行号)"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """按固定间隔采样指定线程的调用栈，结果为折叠栈格式（flamegraph.pl / speedscope 可直接读取）"""
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='profile-sampler', daemon=True)
+    
+    def start(self):
+        self.thread.start()
+    
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+    
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+    
+    def write(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+    
+    def top_functions(self):
+        """按自身采样数排序的热点函数，同时给出包含子调用的采样数"""
+        total = sum(self.stacks.values()) or 1
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            names = stack.split(';')
+            own[names[-1]] += count
+            for name in set(names):
+                inclusive[name] += count
+        return [{
+            'function': name,
+            'self_samples': count,
+            'self_percent': round(count * 100 / total, 1),
+            'total_samples': inclusive[name],
+            'total_percent': round(inclusive[name] * 100 / total, 1)
+        } for name, count in own.most_common(TOP_FUNCTIONS)]
+
+class DeterministicProfiler:
+    """cProfile分析，结果为pstats文件（可用 snakeviz、flameprof 等工具查看）"""
+    
+    def __init__(self):
+        self.profile = cProfile.Profile()
+    
+    def start(self):
+        self.profile.enable()
+    
+    def stop(self):
+        self.profile.disable()
+    
+    def write(self, file_path):
+        self.profile.dump_stats(file_path)
+    
+    def top_functions(self):
+        """按自身耗时排序的热点函数"""
+        stats = pstats.Stats(self.profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+        return [{
+            'function': f"{name} ({os.path.basename(filename)}:{line})",
+            'calls': calls,
+            'self_ms': round(own_time * 1000, 2),
+            'total_ms': round(total_time * 1000, 2)
+        } for (filename, line, name), (_, calls, own_time, total_time, _) in rows]
+
+# 分析模式：(分析器, 结果文件扩展名)
+PROFILERS = {
+    'sample': (lambda: StackSampler(current_app.config['PROFILE_INTERVAL']), '.folded'),
+    'cprofile': (DeterministicProfiler, '.prof'),
+}
+
+def requested_mode():
+    """请求要求的分析模式，未要求或不是管理员时返回None"""
+    value = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_ARG)
+    if not value:
+        return None
+    mode = PROFILE_MODES.get(value.lower())
+    if not mode or not current_user.is_authenticated or not current_user.is_admin:
+        return None
+    return mode
+
+def start_profile():
+    """管理员请求携带分析标记时开始分析（其他请求只检查一次请求头）"""
+    if PROFILE_HEADER not in request.headers and PROFILE_ARG not in request.args:
+        return
+    mode = requested_mode()
+    if not mode:
+        return
+    
+    profiler = PROFILERS[mode][0]()
+    try:
+        profiler.start()
+    except ValueError:
+        # 已有其他分析器在运行（同一时刻只能有一个cProfile）
+        return
+    g.profile = {'mode': mode, 'profiler': profiler, 'start': time.perf_counter()}
+
+def get_profile_folder():
+    folder = current_app.config['PROFILE_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def prune_profiles(folder):
+    """只保留最近的 PROFILE_KEEP 个分析结果"""
+    keep = current_app.config['PROFILE_KEEP']
+    profile_ids = sorted(
+        (name[:-5] for name in os.listdir(folder) if name.endswith('.json')), reverse=True
+    )
+    for profile_id in profile_ids[keep:]:
+        for ext in ('.json', '.folded', '.prof'):
+            try:
+                os.remove(os.path.join(folder, profile_id + ext))
+            except OSError:
+                pass
+
+def finish_profile(response):
+    """结束分析并保存结果，响应头 X-Profile-Id 返回分析结果ID
+    
+    流式响应只包含视图函数本身的执行（不含逐块生成响应内容的时间）
+    """
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    
+    profiler = profile['profiler']
+    profiler.stop()
+    duration = time.perf_counter() - profile['start']
+    
+    profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    folder = get_profile_folder()
+    ext = PROFILERS[profile['mode']][1]
+    profiler.write(os.path.join(folder, profile_id + ext))
+    meta = {
+        'id': profile_id,
+        'mode': profile['mode'],
+        'file': profile_id + ext,
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'status': response.status_code,
+        'user_id': current_user.id,
+        'duration_ms': round(duration * 1000, 2),
+        'created_at': datetime.utcnow().isoformat(),
+        'top_functions': profiler.top_functions()
+    }
+    with open(os.path.join(folder, profile_id + '.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    prune_profiles(folder)
+    
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+def abort_profile(error=None):
+    """请求异常结束时停止分析器"""
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile['profiler'].stop()
+
+def admin_required(f):
+    """仅管理员可访问"""
+    @wraps(f)
+    @login_required
+    def decorated(*args, **kwargs):
+        if not current_user.is_admin:
+            return jsonify({'success': False, 'message': '需要管理员权限'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+def load_meta(profile_id):
+    """读取分析结果信息，不存在时返回None"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(get_profile_folder(), profile_id + '.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+@profiler_bp.route('', methods=['GET'])
+@admin_required
+def list_profiles():
+    """分析结果列表（最新的在前）"""
+    folder = get_profile_folder()
+    profile_ids = sorted(
+        (name[:-5] for name in os.listdir(folder) if name.endswith('.json')), reverse=True
+    )
+    profiles = []
+    for profile_id in profile_ids:
+        meta = load_meta(profile_id)
+        if meta:
+            meta.pop('top_functions', None)
+            profiles.append(meta)
+    return jsonify({'success': True, 'profiles': profiles})
+
+@profiler_bp.route('/<profile_id>', methods=['GET'])
+@admin_required
+def get_profile(profile_id):
+    """分析结果详情（包括热点函数）"""
+    meta = load_meta(profile_id)
+    if not meta:
+        return jsonify({'success': False, 'message': '分析结果不存在'}), 404
+    return jsonify({'success': True, 'profile': meta})
+
+@profiler_bp.route('/<profile_id>/download', methods=['GET'])
+@admin_required
+def download_profile(profile_id):
+    """下载分析结果文件（.folded 折叠栈或 .prof pstats文件）"""
+    meta = load_meta(profile_id)
+    file_path = meta and os.path.join(get_profile_folder(), meta['file'])
+    if not file_path or not os.path.exists(file_path):
+        return jsonify({'success': False, 'message': '分析结果不存在'}), 404
+    return send_file(file_path, as_attachment=True, download_name=meta['file'])
+
+@profiler_bp.route('/<profile_id>', methods=['DELETE'])
+@admin_required
+def delete_profile(profile_id):
+    """删除分析结果"""
+    meta = load_meta(profile_id)
+    if not meta:
+        return jsonify({'success': False, 'message': '分析结果不存在'}), 404
+    for name in (profile_id + '.json', meta['file']):
+        try:
+            os.remove(os.path.join(get_profile_folder(), name))
+        except OSError:
+            pass
+    return jsonify({'success': True, 'message': '分析结果已删除'})
+
+def init_profiler(app):
+    """注册按请求的性能分析（PROFILER_ENABLED 为false时不注册）
+    
+    需要在 init_metrics 之前调用，使分析覆盖其他请求钩子和响应压缩
+    """
+    if not app.config.get('PROFILER_ENABLED', True):
+        return
+    
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.teardown_request(abort_profile)
+    app.register_blueprint(profiler_bp)
@@ -0,0 +1,96 @@
+import gzip
+from datetime import date, datetime
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时使用标准库json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时只使用gzip
+    brotli = None
+
+def _default(obj):
+    """标准库json无法处理的类型，日期统一输出为ISO格式（与orjson一致）"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+class JSONProvider(DefaultJSONProvider):
+    """标准库JSON序列化，日期输出为ISO格式"""
+
+    default = staticmethod(_default)
+
+class OrjsonProvider(JSONProvider):
+    """基于orjson的JSON序列化，原生支持datetime"""
+
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        """序列化为字符串（带参数时交给标准库处理）"""
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        """反序列化"""
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """生成JSON响应，直接输出bytes避免再次编码"""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.option
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        data = orjson.dumps(obj, default=_default, option=option) + b'\n'
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+def accepted_encoding():
+    """根据Accept-Encoding选择压缩算法"""
+    accept = request.accept_encodings
+    if brotli and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+def compress_response(response, app):
+    """压缩超过阈值的响应"""
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in app.config['COMPRESS_MIMETYPES']:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    encoding = accepted_encoding()
+    if encoding == 'br':
+        data = brotli.compress(data, quality=app.config['COMPRESS_BR_LEVEL'])
+    elif encoding == 'gzip':
+        data = gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL'])
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_responses(app):
+    """配置JSON序列化和响应压缩"""
+    app.json = OrjsonProvider(app) if orjson else JSONProvider(app)
+
+    if app.config.get('COMPRESS_ENABLED', True):
+        @app.after_request
+        def compress(response):
+            return compress_response(response, app)
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from flask import request, session, has_request_context
+from sqlalchemy import event
+from structured_log import JsonLinesLog
+from tracing import current_trace_id
+
+# 已记录执行计划的语句指纹（每个进程只对每类语句执行一次EXPLAIN）
+_explained = set()
+_explained_lock = threading.Lock()
+EXPLAIN_LIMIT = 10000
+
+# 日志中语句的最大长度
+STATEMENT_MAX_LENGTH = 4000
+
+# 可以获取执行计划的语句
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PARAM_LIST = re.compile(r'\(\s*(?:\?|%\([^)]+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\([^)]+\)s|%s|:\w+))*\s*\)')
+
+def fingerprint(statement):
+    """语句指纹：去掉字面量、合并IN列表的参数个数后取哈希，同类语句的指纹相同"""
+    normalized = ' '.join(statement.split())
+    normalized = STRING_LITERAL.sub('?', normalized)
+    normalized = NUMBER_LITERAL.sub('?', normalized)
+    normalized = PARAM_LIST.sub('(...)', normalized)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+def parameter_shape(parameters, executemany):
+    """参数的结构（类型和数量），不记录参数值"""
+    def shape(params):
+        if isinstance(params, dict):
+            return {key: type(value).__name__ for key, value in params.items()}
+        if isinstance(params, (list, tuple)):
+            return [type(value).__name__ for value in params]
+        return type(params).__name__
+    
+    if executemany:
+        rows = list(parameters) if not isinstance(parameters, list) else parameters
+        return {'rows': len(rows), 'row': shape(rows[0]) if rows else None}
+    return shape(parameters)
+
+def request_info():
+    """当前请求的接口、方法、路径和用户ID；后台任务中返回空值"""
+    if not has_request_context():
+        return {'endpoint': None, 'method': None, 'path': None, 'user_id': None}
+    # 从会话读取用户ID，避免在SQL事件中触发用户加载查询
+    return {
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.path,
+        'user_id': session.get('_user_id')
+    }
+
+def should_explain(key):
+    """每个指纹只在第一次出现时执行EXPLAIN"""
+    with _explained_lock:
+        if key in _explained or len(_explained) >= EXPLAIN_LIMIT:
+            return False
+        _explained.add(key)
+        return True
+
+def explain(conn, statement, parameters):
+    """在同一连接上获取语句的执行计划，失败时返回错误信息"""
+    dialect = conn.dialect.name
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    cursor = conn.connection.cursor()
+    try:
+        # PostgreSQL中语句出错会中止整个事务，使用保存点隔离
+        if dialect == 'postgresql':
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+        except Exception as e:
+            if dialect == 'postgresql':
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            return [f'EXPLAIN失败: {e}']
+        if dialect == 'postgresql':
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        return plan
+    except Exception as e:
+        return [f'EXPLAIN失败: {e}']
+    finally:
+        cursor.close()
+
+class SlowQueryLog:
+    """记录执行时间超过阈值的SQL语句，每条记录为一行JSON"""
+    
+    def __init__(self, app):
+        self.threshold = app.config['SLOW_QUERY_MS'] / 1000
+        self.explain = app.config['SLOW_QUERY_EXPLAIN']
+        self.log = JsonLinesLog(
+            'skc.slow_query',
+            app.config['SLOW_QUERY_LOG'],
+            app.config['SLOW_QUERY_LOG_MAX_BYTES'],
+            app.config['SLOW_QUERY_LOG_BACKUPS']
+        )
+    
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+    
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['slow_query_start'].pop()
+        if elapsed < self.threshold:
+            return
+        
+        key = fingerprint(statement)
+        entry = {
+            'time': datetime.utcnow().isoformat(timespec='milliseconds') + 'Z',
+            'duration_ms': round(elapsed * 1000, 2),
+            'fingerprint': key,
+            'statement': ' '.join(statement.split())[:STATEMENT_MAX_LENGTH],
+            'parameters': parameter_shape(parameters, executemany),
+            'executemany': executemany,
+            'pid': os.getpid(),
+            'trace_id': current_trace_id(),
+            **request_info()
+        }
+        if (self.explain and not executemany
+                and entry['statement'].lstrip('( ').upper().startswith(EXPLAINABLE)
+                and should_explain(key)):
+            entry['explain'] = explain(conn, statement, parameters)
+        
+        self.log.write(entry)
+    
+    def handle_error(self, context):
+        """语句出错时不会调用 after_cursor_execute，在这里取出开始时间"""
+        starts = context.connection.info.get('slow_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+def init_slow_query_log(app, db):
+    """为数据库引擎注册慢查询记录（SLOW_QUERY_MS 为0时不记录）"""
+    if not app.config.get('SLOW_QUERY_MS'):
+        return
+    
+    slow_log = SlowQueryLog(app)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', slow_log.before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', slow_log.after_cursor_execute)
+    event.listen(engine, 'handle_error', slow_log.handle_error)
+    app.extensions['slow_query_log'] = slow_log
@@ -512,63 +512,24 @@ function autoSortSKCs() {
     // 显示进度提示
     showAlert('正在整理SKC数据，请稍候...', 'info');
     
-    // 获取当前项目的所有产品和SKC数据
-    fetch(`/api/projects/${currentProject}/products`)
+    // 由服务端一次性写入排序键，列表和导出都按此顺序展示
+    fetch(`/api/projects/${currentProject}/auto_sort`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({})
+    })
     .then(response => response.json())
     .then(data => {
         if (!data.success) {
             throw new Error(data.message);
         }
         
-        const products = data.products;
-        let totalOperations = 0;
-        let completedOperations = 0;
-        
-        // 为每个产品获取SKC并按状态排序
-        const sortPromises = products.map(product => {
-            return fetch(`/api/products/${product.id}/skcs`)
-            .then(response => response.json())
-            .then(skcData => {
-                if (skcData.success && skcData.skcs.length > 0) {
-                    // 按状态优先级排序SKC
-                    const statusPriority = {
-                        '核价通过': 1,
-                        '拉过库存': 2,
-                        '价格待定': 3,
-                        '改过体积': 4,
-                        '价格错误': 5,
-                        '减少库存为0': 6,
-                        '已下架': 7
-                    };
-                    
-                    const sortedSKCs = skcData.skcs.sort((a, b) => {
-                        const priorityA = statusPriority[a.status] || 999;
-                        const priorityB = statusPriority[b.status] || 999;
-                        
-                        if (priorityA !== priorityB) {
-                            return priorityA - priorityB;
-                        }
-                        
-                        // 如果状态相同，按SKC代码排序
-                        return a.code.localeCompare(b.code);
-                    });
-                    
-                    totalOperations += sortedSKCs.length;
-                    
-                    // 这里可以实现重新排序的逻辑
-                    // 由于当前API不支持直接重排序，我们通过状态统计来模拟整理效果
-                    completedOperations += sortedSKCs.length;
-                }
-            });
-        });
-        
-        return Promise.all(sortPromises);
-    })
-    .then(() => {
         // 刷新数据显示整理结果
         loadProjectData();
         loadStats();
-        showAlert(`自动整理完成！已按状态优先级重新排序所有SKC数据。`, 'success');
+        showAlert(data.message, 'success');
     })
     .catch(error => {
         console.error('自动整理失败:', error);
@@ -711,28 +672,80 @@ function exportToExcel() {
     const btn = $('.btn:contains("导出Excel")');
     showLoading(btn);
     
+    // 导出在后台执行，创建任务后轮询进度
     fetch(`/api/projects/${currentProject}/export`, {
         method: 'POST'
     })
     .then(response => response.json())
     .then(data => {
-        if (data.success) {
-            showAlert(data.message, 'success');
-            // 自动下载文件
-            downloadExport(data.export.id);
-        } else {
-            showAlert(data.message, 'danger');
+        if (!data.success) {
+            throw new Error(data.message);
         }
+        showAlert('导出任务已创建，正在生成Excel...', 'info');
+        return waitForExportJob(data.job.id, job => showExportProgress(btn, job));
+    })
+    .then(job => {
+        showAlert(job.message, 'success');
+        // 自动下载文件
+        downloadExport(job.export.id);
     })
     .catch(error => {
         console.error('Error:', error);
-        showAlert('导出失败', 'danger');
+        showAlert(error.message || '导出失败', 'danger');
     })
     .finally(() => {
+        $(btn).find('.export-progress').remove();
         hideLoading(btn);
     });
 }
 
+// 导出任务的最长等待时间，超时后停止轮询（任务可能因服务重启而中断）
+const EXPORT_POLL_TIMEOUT = 10 * 60 * 1000;
+
+function showExportProgress(btn, job) {
+    let label = $(btn).find('.export-progress');
+    if (!label.length) {
+        label = $('<span class="export-progress ms-2 small"></span>').insertBefore($(btn).find('.loading'));
+    }
+    if (job.total > 0) {
+        label.text(`${job.progress}/${job.total} (${Math.floor(job.progress * 100 / job.total)}%)`);
+    } else {
+        label.text(job.status === 'pending' ? '排队中' : '准备中');
+    }
+}
+
+function waitForExportJob(jobId, onProgress, interval = 1000) {
+    const deadline = Date.now() + EXPORT_POLL_TIMEOUT;
+    return new Promise((resolve, reject) => {
+        const poll = () => {
+            fetch(`/api/export_jobs/${jobId}`)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    reject(new Error(data.message));
+                    return;
+                }
+                
+                const job = data.job;
+                if (job.status === 'done') {
+                    resolve(job);
+                } else if (job.status === 'failed') {
+                    reject(new Error(job.message || '导出失败'));
+                } else if (Date.now() > deadline) {
+                    reject(new Error('导出超时，请稍后重试'));
+                } else {
+                    if (onProgress) {
+                        onProgress(job);
+                    }
+                    setTimeout(poll, interval);
+                }
+            })
+            .catch(reject);
+        };
+        poll();
+    });
+}
+
 function downloadExport(exportId) {
     window.open(`/api/exports/${exportId}/download`, '_blank');
 }
@@ -746,28 +759,23 @@ function handleExcelImport(file) {
     }
     
     // 检查文件类型
-    if (!file.name.match(/\.(xlsx|xlsm)$/i)) {
-        showAlert('请选择Excel文件（.xlsx或.xlsm格式）', 'warning');
+    if (!file.name.match(/\.(xlsx|xlsm|csv|tsv)$/i)) {
+        showAlert('请选择Excel或CSV文件（.xlsx、.xlsm、.csv或.tsv格式）', 'warning');
         return;
     }
     
     $('#importProgressModal').modal('show');
-    $('#importProgressText').text('正在上传Excel文件...');
+    $('#importProgressText').text('正在上传文件...');
     $('#importProgressBar').css('width', '20%');
     
-    // 创建FormData对象
-    const formData = new FormData();
-    formData.append('excel', file);
+    const mode = $('#importUpsert').is(':checked') ? 'upsert' : null;
     
-    // 发送到服务器
-    fetch(`/api/projects/${currentProject}/import`, {
-        method: 'POST',
-        body: formData,
-        credentials: 'same-origin',  // 包含认证信息
-        headers: {
-            'X-Requested-With': 'XMLHttpRequest'  // 标识为AJAX请求
-        }
-    })
+    // 大文件分片上传，其他文件直接上传
+    const request = file.size > CHUNKED_UPLOAD_THRESHOLD
+        ? chunkedImport(file, mode)
+        : uploadImportFile(file, mode);
+    
+    request
     .then(response => {
         $('#importProgressBar').css('width', '80%');
         
@@ -821,6 +829,108 @@ function handleExcelImport(file) {
     });
 }
 
+// 超过该大小的文件使用分片上传
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+
+// 超过该大小的文件不在浏览器中计算SHA-256（避免占用过多内存）
+const CHECKSUM_MAX_SIZE = 256 * 1024 * 1024;
+
+function uploadImportFile(file, mode) {
+    // 创建FormData对象
+    const formData = new FormData();
+    formData.append('excel', file);
+    if (mode) {
+        formData.append('mode', mode);
+    }
+    
+    // 发送到服务器
+    return fetch(`/api/projects/${currentProject}/import`, {
+        method: 'POST',
+        body: formData,
+        credentials: 'same-origin',  // 包含认证信息
+        headers: {
+            'X-Requested-With': 'XMLHttpRequest'  // 标识为AJAX请求
+        }
+    });
+}
+
+function fileSha256(file) {
+    if (!window.crypto || !crypto.subtle || file.size > CHECKSUM_MAX_SIZE) {
+        return Promise.resolve(null);
+    }
+    
+    return file.arrayBuffer()
+    .then(buffer => crypto.subtle.digest('SHA-256', buffer))
+    .then(digest => Array.from(new Uint8Array(digest))
+        .map(b => b.toString(16).padStart(2, '0'))
+        .join(''));
+}
+
+function chunkedImport(file, mode, maxRetries = 3) {
+    // 创建上传会话 -> 按偏移量上传分片（失败时从服务端记录的位置重试）-> 完成并导入
+    return fileSha256(file)
+    .then(sha256 => fetch(`/api/projects/${currentProject}/uploads`, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({filename: file.name, size: file.size, sha256: sha256})
+    }))
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.message);
+        }
+        
+        const upload = data.upload;
+        let retries = 0;
+        
+        const sendFrom = offset => {
+            if (offset >= file.size) {
+                return Promise.resolve();
+            }
+            
+            const chunk = file.slice(offset, offset + upload.chunk_size);
+            return fetch(`/api/uploads/${upload.id}?offset=${offset}`, {
+                method: 'PUT',
+                body: chunk
+            })
+            .then(response => response.json())
+            .then(result => {
+                if (!result.upload) {
+                    throw new Error(result.message);
+                }
+                
+                const received = result.upload.received;
+                $('#importProgressText').text(`正在上传文件... ${Math.floor(received * 100 / file.size)}%`);
+                $('#importProgressBar').css('width', `${20 + Math.floor(received * 60 / file.size)}%`);
+                
+                if (result.success) {
+                    retries = 0;
+                } else if (++retries > maxRetries) {
+                    throw new Error(result.message);
+                }
+                return sendFrom(received);
+            }, error => {
+                // 网络中断时查询已接收的位置后继续
+                if (++retries > maxRetries) {
+                    throw error;
+                }
+                return fetch(`/api/uploads/${upload.id}`)
+                .then(response => response.json())
+                .then(result => sendFrom(result.upload ? result.upload.received : offset));
+            });
+        };
+        
+        return sendFrom(0).then(() => {
+            $('#importProgressText').text('正在导入数据...');
+            return fetch(`/api/uploads/${upload.id}/complete`, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({mode: mode})
+            });
+        });
+    });
+}
+
 // ========== 统计数据 ==========
 
 function loadStats() {
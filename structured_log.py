@@ -0,0 +1,41 @@
+import json
+import logging
+import os
+import threading
+from logging.handlers import RotatingFileHandler
+
+class JsonLinesLog:
+    """按大小轮转的日志文件，每条记录为一行JSON
+    
+    在第一次写入时才打开文件，使gunicorn预加载后fork的每个进程使用自己的文件句柄；
+    路径中的 {pid} 替换为进程ID，多个进程可以各自写入自己的文件
+    """
+    
+    def __init__(self, name, path, max_bytes, backups):
+        self.logger = logging.getLogger(name)
+        self.logger.propagate = False
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.handler_key = None
+        self.lock = threading.Lock()
+    
+    def ensure_handler(self):
+        pid = os.getpid()
+        path = self.path.replace('{pid}', str(pid))
+        if self.handler_key == (pid, path):
+            return
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.INFO)
+        self.handler_key = (pid, path)
+    
+    def write(self, entry):
+        with self.lock:
+            self.ensure_handler()
+        self.logger.info(json.dumps(entry, ensure_ascii=False, default=str))
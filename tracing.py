@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+请求和后台任务的追踪
+在请求、导出任务、SQL、Redis、openpyxl 和 Pillow 操作外记录span，按追踪ID（请求ID）汇总后
+以OTLP JSON格式写入本地文件或发送到OTLP/HTTP收集器
+
+查看追踪: python tracing.py logs/traces.jsonl [--trace-id ID]
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import queue
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from collections import defaultdict
+from functools import wraps
+from flask import g, request, session
+from sqlalchemy import event
+from structured_log import JsonLinesLog
+
+# 当前进行中的span
+_current_span = contextvars.ContextVar('trace_span', default=None)
+
+# 追踪配置，由 init_tracing 设置；为None时不追踪
+_tracer = None
+
+# 请求ID格式（兼容W3C trace id）
+TRACE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# span中SQL语句的最大长度
+STATEMENT_MAX_LENGTH = 500
+
+class NoopSpan:
+    """未追踪时使用的空span"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+    
+    def set(self, **attributes):
+        pass
+    
+    def end(self):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+class Span:
+    """一段计时的操作，作为上下文管理器使用；结束时加入所属追踪"""
+    
+    def __init__(self, trace, name, parent_id, attributes):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.start_counter = time.perf_counter_ns()
+        self.end_ns = None
+        self.token = None
+    
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+    
+    def __enter__(self):
+        self.token = _current_span.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.error = f'{exc_type.__name__}: {exc}'
+        self.end()
+        return False
+    
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self.start_counter
+        if self.token is not None:
+            _current_span.reset(self.token)
+            self.token = None
+        self.trace.finish(self)
+    
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6
+
+class Trace:
+    """一次请求或任务的所有span，根span结束时导出"""
+    
+    def __init__(self, tracer, trace_id):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.root = None
+        self.spans = []
+        self.dropped = 0
+    
+    def finish(self, span):
+        if span is self.root:
+            span.attributes['trace.dropped_spans'] = self.dropped
+            self.spans.append(span)
+            if span.duration_ms >= self.tracer.min_duration_ms:
+                self.tracer.export(self)
+        elif len(self.spans) < self.tracer.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+def span(name, **attributes):
+    """在当前追踪中创建子span；不在追踪中（未启用或不在请求/任务中）时返回空span
+    
+    用法: with span('openpyxl.load_workbook', sheets=3) as s: ...; s.set(rows=n)
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+def traced(name):
+    """装饰器：在span中执行函数"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def start_trace(name, trace_id=None, **attributes):
+    """开始一次追踪，返回根span（作为上下文管理器使用或手动调用 end()）；未启用追踪时返回空span"""
+    if _tracer is None:
+        return NOOP_SPAN
+    trace = Trace(_tracer, trace_id if trace_id and TRACE_ID.match(trace_id) else new_trace_id())
+    root = Span(trace, name, None, attributes)
+    trace.root = root
+    return root
+
+def new_trace_id():
+    return uuid.uuid4().hex
+
+def current_trace_id():
+    """当前追踪ID，不在追踪中时返回None"""
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
+
+def otlp_value(value):
+    """转换为OTLP属性值"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def to_otlp(trace, service_name):
+    """转换为OTLP/HTTP JSON格式（ExportTraceServiceRequest）"""
+    spans = []
+    for item in trace.spans:
+        data = {
+            'traceId': trace.trace_id,
+            'spanId': item.span_id,
+            'name': item.name,
+            'kind': 2 if 'http.method' in item.attributes else 1,
+            'startTimeUnixNano': str(item.start_ns),
+            'endTimeUnixNano': str(item.end_ns),
+            'attributes': [{'key': key, 'value': otlp_value(value)} for key, value in item.attributes.items()],
+            'status': {'code': 2, 'message': item.error} if item.error else {'code': 1}
+        }
+        if item.parent_id:
+            data['parentSpanId'] = item.parent_id
+        spans.append(data)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': service_name}},
+                {'key': 'process.pid', 'value': {'intValue': str(os.getpid())}}
+            ]},
+            'scopeSpans': [{'scope': {'name': 'skc.tracing'}, 'spans': spans}]
+        }]
+    }
+
+class Tracer:
+    """追踪配置和导出：写入本地文件，配置了收集器地址时在后台线程中发送"""
+    
+    def __init__(self, app):
+        self.service_name = app.config['TRACE_SERVICE_NAME']
+        self.min_duration_ms = app.config['TRACE_SLOW_MS']
+        self.max_spans = app.config['TRACE_MAX_SPANS']
+        self.log = JsonLinesLog(
+            'skc.tracing',
+            app.config['TRACE_FILE'],
+            app.config['TRACE_FILE_MAX_BYTES'],
+            app.config['TRACE_FILE_BACKUPS']
+        ) if app.config['TRACE_FILE'] else None
+        self.endpoint = app.config['TRACE_OTLP_ENDPOINT']
+        self.queue = queue.Queue(maxsize=1000)
+        self.sender = None
+        self.sender_pid = None
+    
+    def export(self, trace):
+        data = to_otlp(trace, self.service_name)
+        if self.log:
+            self.log.write(data)
+        if self.endpoint:
+            self.ensure_sender()
+            try:
+                self.queue.put_nowait(data)
+            except queue.Full:
+                pass  # 收集器不可用时丢弃，不影响请求
+    
+    def ensure_sender(self):
+        # fork之后的进程需要启动自己的发送线程
+        if self.sender_pid != os.getpid():
+            self.sender_pid = os.getpid()
+            self.sender = threading.Thread(target=self.send_loop, name='trace-sender', daemon=True)
+            self.sender.start()
+    
+    def send_loop(self):
+        while True:
+            data = self.queue.get()
+            try:
+                urllib.request.urlopen(urllib.request.Request(
+                    self.endpoint,
+                    data=json.dumps(data, ensure_ascii=False).encode('utf-8'),
+                    headers={'Content-Type': 'application/json'},
+                    method='POST'
+                ), timeout=5).close()
+            except Exception:
+                pass
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    item = NOOP_SPAN
+    if _current_span.get() is not None:
+        item = span(
+            'db.query',
+            **{'db.system': conn.dialect.name, 'db.statement': ' '.join(statement.split())[:STATEMENT_MAX_LENGTH]}
+        )
+        if executemany:
+            item.set(**{'db.rows': len(parameters)})
+    conn.info.setdefault('trace_spans', []).append(item)
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['trace_spans'].pop().end()
+
+def handle_error(context):
+    """语句出错时结束对应的span"""
+    spans = context.connection.info.get('trace_spans') if context.connection is not None else None
+    if spans:
+        item = spans.pop()
+        item.error = str(context.original_exception)
+        item.end()
+
+def instrument_redis(client):
+    """为Redis命令创建span"""
+    if client is None or getattr(client, '_tracing_instrumented', False):
+        return
+    execute_command = client.execute_command
+    
+    def traced(*args, **kwargs):
+        with span('redis', **{'db.operation': str(args[0]) if args else ''}):
+            return execute_command(*args, **kwargs)
+    
+    client.execute_command = traced
+    client._tracing_instrumented = True
+
+def start_request_trace():
+    """请求的根span，沿用请求头中的请求ID"""
+    root = start_trace(
+        f'{request.method} {request.endpoint or "unmatched"}',
+        request.headers.get(REQUEST_ID_HEADER, '').lower().replace('-', ''),
+        **{'http.method': request.method, 'http.route': request.url_rule.rule if request.url_rule else request.path}
+    )
+    root.__enter__()
+    g.trace_root = root
+
+def finish_request_trace(response):
+    """结束根span并在响应头中返回请求ID（流式响应不包含生成内容的时间）"""
+    root = g.pop('trace_root', None)
+    if root is None:
+        return response
+    root.set(**{'http.status_code': response.status_code, 'user.id': session.get('_user_id') or ''})
+    root.end()
+    response.headers[REQUEST_ID_HEADER] = root.trace.trace_id
+    return response
+
+def abort_request_trace(error=None):
+    root = g.pop('trace_root', None)
+    if root is not None:
+        if error is not None:
+            root.error = str(error)
+        root.end()
+
+def init_tracing(app, db, cache):
+    """注册请求、SQL和Redis追踪（TRACING_ENABLED 为false时不追踪）"""
+    global _tracer
+    if not app.config.get('TRACING_ENABLED'):
+        return
+    
+    _tracer = Tracer(app)
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(engine, 'handle_error', handle_error)
+    instrument_redis(cache.redis_client)
+    
+    app.before_request(start_request_trace)
+    app.after_request(finish_request_trace)
+    app.teardown_request(abort_request_trace)
+
+def load_traces(file_path):
+    """读取追踪文件，返回 {追踪ID: [span, ...]}"""
+    traces = defaultdict(list)
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            for resource in json.loads(line)['resourceSpans']:
+                for scope in resource['scopeSpans']:
+                    for item in scope['spans']:
+                        traces[item['traceId']].append(item)
+    return traces
+
+def print_trace(spans):
+    """按调用层级输出span耗时，以及按名称汇总的自身耗时"""
+    def duration(item):
+        return (int(item['endTimeUnixNano']) - int(item['startTimeUnixNano'])) / 1e6
+    
+    children = defaultdict(list)
+    span_ids = {item['spanId'] for item in spans}
+    roots = []
+    for item in sorted(spans, key=lambda item: int(item['startTimeUnixNano'])):
+        parent = item.get('parentSpanId')
+        if parent in span_ids:
+            children[parent].append(item)
+        else:
+            roots.append(item)
+    
+    own_time = defaultdict(float)
+    
+    def walk(item, depth):
+        child_time = sum(duration(child) for child in children[item['spanId']])
+        own_time[item['name']] += max(0.0, duration(item) - child_time)
+        attributes = {attr['key']: list(attr['value'].values())[0] for attr in item['attributes']}
+        detail = attributes.get('db.statement') or attributes.get('http.route') or ''
+        print(f"{'  ' * depth}{item['name']:<{40 - 2 * depth}}{duration(item):>10.1f}ms  {detail[:80]}")
+        # 大量同名子span（例如逐条SQL）合并显示
+        grouped = defaultdict(list)
+        for child in children[item['spanId']]:
+            grouped[child['name']].append(child)
+        for name, group in grouped.items():
+            if len(group) > 5 and not any(children[child['spanId']] for child in group):
+                total = sum(duration(child) for child in group)
+                own_time[name] += total
+                print(f"{'  ' * (depth + 1)}{name + f' ×{len(group)}':<{38 - 2 * depth}}{total:>10.1f}ms")
+            else:
+                for child in group:
+                    walk(child, depth + 1)
+    
+    for root in roots:
+        walk(root, 0)
+    
+    print('\n自身耗时汇总:')
+    for name, total in sorted(own_time.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name:<38}{total:>10.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='查看追踪记录')
+    parser.add_argument('file', help='追踪文件（TRACE_FILE）')
+    parser.add_argument('--trace-id', help='追踪ID（请求ID），默认显示最慢的一次')
+    args = parser.parse_args()
+    
+    traces = load_traces(args.file)
+    if not traces:
+        print('没有追踪记录')
+        return
+    
+    def total(spans):
+        return max(int(item['endTimeUnixNano']) for item in spans) - min(int(item['startTimeUnixNano']) for item in spans)
+    
+    trace_id = args.trace_id or max(traces, key=lambda key: total(traces[key]))
+    if trace_id not in traces:
+        print(f'追踪 {trace_id} 不存在')
+        return
+    print(f'追踪 {trace_id}（{len(traces[trace_id])} 个span）\n')
+    print_trace(traces[trace_id])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import threading
+import time
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from models import db, User
+from cache import cache
+
+# 每个工作进程内的缓存：{用户ID: (过期时间, 用户信息)}
+_local_users = {}
+_local_lock = threading.Lock()
+LOCAL_CACHE_MAX_USERS = 10000
+
+class CachedUser(UserMixin):
+    """登录用户的基本信息（ID、用户名、状态），用于 current_user
+    
+    其他属性（邮箱、登录时间、check_password 等）在第一次访问时从数据库加载完整的用户记录
+    """
+    
+    def __init__(self, identity):
+        self.id = identity['id']
+        self.username = identity['username']
+        self.active = identity['is_active']
+        self.is_admin = identity['is_admin']
+        self._model = None
+    
+    @property
+    def is_active(self):
+        return self.active
+    
+    @property
+    def model(self):
+        """完整的用户记录（每个请求最多查询一次）"""
+        if self._model is None:
+            self._model = db.session.get(User, self.id)
+        return self._model
+    
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+def user_identity(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'is_active': bool(user.is_active),
+        'is_admin': bool(user.is_admin)
+    }
+
+def get_local(user_id):
+    entry = _local_users.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def set_local(user_id, identity):
+    with _local_lock:
+        if len(_local_users) >= LOCAL_CACHE_MAX_USERS:
+            _local_users.clear()
+        _local_users[user_id] = (time.monotonic() + current_app.config['USER_CACHE_LOCAL_TTL'], identity)
+
+def load_user(user_id):
+    """Flask-Login 的 user_loader：依次从进程内缓存、Redis、数据库读取用户信息"""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    
+    identity = get_local(user_id)
+    if identity is None:
+        identity = cache.get(f'user_identity:{user_id}')
+        if identity is None:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            identity = user_identity(user)
+            cache.set(f'user_identity:{user_id}', identity, timeout=current_app.config['USER_CACHE_TTL'])
+        set_local(user_id, identity)
+    return CachedUser(identity)
+
+def invalidate_user(user_id):
+    """删除用户信息缓存（其他工作进程的进程内缓存在 USER_CACHE_LOCAL_TTL 内过期）"""
+    with _local_lock:
+        _local_users.pop(user_id, None)
+    cache.delete(f'user_identity:{user_id}')
+
+def track_user_update(mapper, connection, target):
+    """记录本次事务中修改的用户，提交后删除缓存（避免提交前被其他请求重新缓存旧数据）"""
+    object_session(target).info.setdefault('updated_users', set()).add(target.id)
+
+def invalidate_updated_users(session):
+    for user_id in session.info.pop('updated_users', ()):
+        invalidate_user(user_id)
+
+def discard_updated_users(session, previous_transaction):
+    session.info.pop('updated_users', None)
+
+def init_user_cache(login_manager):
+    """注册缓存的 user_loader，用户记录修改或删除后自动删除缓存"""
+    login_manager.user_loader(load_user)
+    if not event.contains(User, 'after_update', track_user_update):
+        event.listen(User, 'after_update', track_user_update)
+        event.listen(User, 'after_delete', track_user_update)
+        event.listen(db.session, 'after_commit', invalidate_updated_users)
+        event.listen(db.session, 'after_soft_rollback', discard_updated_users)
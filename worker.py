@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+SKC管理系统后台任务进程
+执行导出等耗时任务（JOB_RUNNER=worker 时使用），并定期清理过期文件
+"""
+
+import os
+import argparse
+from app import create_app
+from jobs import run_worker
+from janitor import run_janitor
+
+def main():
+    parser = argparse.ArgumentParser(description='SKC管理系统后台任务进程')
+    parser.add_argument('--env', choices=['development', 'production'],
+                       default=os.environ.get('FLASK_ENV', 'production'), help='运行环境')
+    parser.add_argument('--interval', type=float, default=2.0, help='轮询间隔（秒）')
+    parser.add_argument('--janitor-once', action='store_true', help='执行一次文件清理后退出（用于定时任务）')
+    
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    
+    if args.janitor_once:
+        with app.app_context():
+            report = run_janitor()
+        print(f"🧹 清理完成，释放 {report['reclaimed_bytes'] / 1024 / 1024:.1f}MB")
+        for name, item in report.items():
+            if name != 'reclaimed_bytes':
+                count = f"{item['count']} 个, " if item['count'] is not None else ''
+                print(f"   {name}: {count}{item['bytes']} 字节")
+        return
+    
+    print(f"🛠️ 后台任务进程启动中... 运行环境: {args.env}")
+    with app.app_context():
+        run_worker(args.interval)
+
+if __name__ == '__main__':
+    main()